@@ -0,0 +1,31 @@
+"""
+Benchmarks of the label pipeline. They run on plain Django with an in-memory SQLite
+database, NetBox itself is replaced by the minimal stubs in `stubs/`.
+
+    pytest benchmarks
+
+Every run is saved as JSON in `.benchmarks/` (see `pytest.ini`), compare runs with
+`pytest benchmarks --benchmark-compare` or `pytest-benchmark compare`.
+"""
+import os
+import sys
+
+import pytest
+from django.conf import settings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, 'stubs'), os.path.dirname(HERE)]
+
+
+def pytest_configure(config):
+    import benchmark_settings
+
+    benchmark_settings.configure()
+
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+@pytest.fixture
+def settings_config():
+    return settings.PLUGINS_CONFIG['netbox_qrcode']
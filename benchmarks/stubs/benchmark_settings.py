@@ -0,0 +1,46 @@
+import os
+
+import django
+from django.conf import settings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+
+
+class Release:
+    version = '4.3.0'
+
+
+def configure():
+    """Configure and set up Django with the stubs in place of NetBox."""
+    if settings.configured:
+        return
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY='benchmarks',
+        ALLOWED_HOSTS=['*'],
+        INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'dcim'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ROOT_URLCONF='benchmark_urls',
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [os.path.join(HERE, 'templates'), os.path.join(ROOT, 'netbox_qrcode', 'templates')],
+            'OPTIONS': {'builtins': ['utilities.templatetags']},
+        }],
+        USE_TZ=True,
+        RELEASE=Release(),
+        PLUGINS=['netbox_qrcode'],
+        PLUGINS_CONFIG={'netbox_qrcode': plugin_config()},
+    )
+    django.setup()
+
+
+def plugin_config():
+    """The plugin configuration as NetBox creates it: the defaults of the plugin."""
+    from netbox_qrcode import QRCodeConfig
+
+    return {
+        name: dict(value) if isinstance(value, dict) else value
+        for name, value in QRCodeConfig.default_settings.items()
+    }
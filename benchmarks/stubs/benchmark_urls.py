@@ -0,0 +1,14 @@
+from django.urls import include, path
+
+from netbox_qrcode.urls import urlpatterns as plugin_urlpatterns
+
+urlpatterns = [
+    path('plugins/', include(([path('qrcode/', include((plugin_urlpatterns, 'netbox_qrcode')))], 'plugins'))),
+]
+
+try:
+    from netbox_qrcode.api.urls import urlpatterns as api_urlpatterns
+except ImportError: # Django REST framework is not installed
+    pass
+else:
+    urlpatterns.append(path('api/plugins/qrcode/', include((api_urlpatterns, 'netbox_qrcode-api'))))
@@ -0,0 +1,2 @@
+class JobStatusChoices:
+    TERMINAL_STATE_CHOICES = ('completed', 'errored', 'failed')
@@ -0,0 +1,52 @@
+class BaseFilterSet:
+    """Filters by `id` only. Unknown parameters are ignored, like NetBox does."""
+
+    def __init__(self, data, queryset, request=None):
+        self.data = data
+        self.queryset = queryset
+        self.errors = {}
+
+    def is_valid(self):
+        self.errors = self.validate()
+        return not self.errors
+
+    def validate(self):
+        return {}
+
+    @property
+    def qs(self):
+        ids = self.data.getlist('id')
+        return self.queryset.filter(pk__in=ids) if ids else self.queryset
+
+
+class CableFilterSet(BaseFilterSet):
+    pass
+
+
+class DeviceFilterSet(BaseFilterSet):
+
+    def validate(self):
+        # The slug of a device type model, no such model exists here
+        if self.data.get('model'):
+            return {'model': [f"Select a valid choice. {self.data['model']} is not one of the available choices."]}
+        return {}
+
+
+class LocationFilterSet(BaseFilterSet):
+    pass
+
+
+class ModuleFilterSet(BaseFilterSet):
+    pass
+
+
+class PowerFeedFilterSet(BaseFilterSet):
+    pass
+
+
+class PowerPanelFilterSet(BaseFilterSet):
+    pass
+
+
+class RackFilterSet(BaseFilterSet):
+    pass
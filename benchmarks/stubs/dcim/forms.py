@@ -0,0 +1,26 @@
+class CableFilterForm:
+    pass
+
+
+class DeviceFilterForm:
+    pass
+
+
+class LocationFilterForm:
+    pass
+
+
+class ModuleFilterForm:
+    pass
+
+
+class PowerFeedFilterForm:
+    pass
+
+
+class PowerPanelFilterForm:
+    pass
+
+
+class RackFilterForm:
+    pass
@@ -0,0 +1,87 @@
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.db import models
+from django.db.models import Q
+
+from .device_components import CabledObjectModel
+
+
+class RestrictedQuerySet(models.QuerySet):
+
+    def restrict(self, user, action='view'):
+        return self
+
+
+class BaseModel(models.Model):
+    name = models.CharField(max_length=64)
+    last_updated = models.DateTimeField(auto_now=True, null=True)
+
+    objects = RestrictedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+    def get_absolute_url(self):
+        return f'/dcim/{self._meta.model_name}s/{self.pk}/'
+
+
+class Site(BaseModel):
+    pass
+
+
+class Location(BaseModel):
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, null=True)
+
+
+class Rack(BaseModel):
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, null=True)
+
+
+class Device(BaseModel):
+    site = models.ForeignKey(Site, on_delete=models.CASCADE)
+    rack = models.ForeignKey(Rack, on_delete=models.SET_NULL, null=True)
+    serial = models.CharField(max_length=64, blank=True)
+
+
+class Module(BaseModel):
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, null=True)
+    serial = models.CharField(max_length=64, blank=True)
+
+
+class PowerPanel(BaseModel):
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, null=True)
+
+
+class PowerFeed(CabledObjectModel, BaseModel):
+    power_panel = models.ForeignKey(PowerPanel, on_delete=models.CASCADE, null=True)
+
+
+class Interface(CabledObjectModel, BaseModel):
+    device = models.ForeignKey(Device, on_delete=models.CASCADE)
+
+
+class Cable(BaseModel):
+    label = models.CharField(max_length=64, blank=True)
+
+    @property
+    def a_terminations(self):
+        return [term.termination for term in self.terminations.all() if term.cable_end == 'A']
+
+    @property
+    def b_terminations(self):
+        return [term.termination for term in self.terminations.all() if term.cable_end == 'B']
+
+
+class CableTermination(models.Model):
+    cable = models.ForeignKey(Cable, on_delete=models.CASCADE, related_name='terminations')
+    cable_end = models.CharField(max_length=1)
+    termination_type = models.ForeignKey(
+        'contenttypes.ContentType',
+        on_delete=models.PROTECT,
+        limit_choices_to=Q(app_label='dcim', model__in=('interface', 'powerfeed')),
+    )
+    termination_id = models.PositiveBigIntegerField()
+    termination = GenericForeignKey('termination_type', 'termination_id')
+    _device = models.ForeignKey(Device, on_delete=models.CASCADE, null=True)
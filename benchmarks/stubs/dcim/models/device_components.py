@@ -0,0 +1,8 @@
+from django.db import models
+
+
+class CabledObjectModel(models.Model):
+    cable = models.ForeignKey('dcim.Cable', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        abstract = True
@@ -0,0 +1,26 @@
+class CableTable:
+    pass
+
+
+class DeviceTable:
+    pass
+
+
+class LocationTable:
+    pass
+
+
+class ModuleTable:
+    pass
+
+
+class PowerFeedTable:
+    pass
+
+
+class PowerPanelTable:
+    pass
+
+
+class RackTable:
+    pass
@@ -0,0 +1,7 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsAuthenticatedOrLoginNotRequired(BasePermission):
+
+    def has_permission(self, request, view):
+        return True
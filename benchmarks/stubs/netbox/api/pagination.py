@@ -0,0 +1,5 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class OptionalLimitOffsetPagination(LimitOffsetPagination):
+    default_limit = 50
@@ -0,0 +1,14 @@
+from django.utils.functional import classproperty
+
+
+class JobRunner:
+
+    class Meta:
+        pass
+
+    def __init__(self, job):
+        self.job = job
+
+    @classproperty
+    def name(cls):
+        return getattr(cls.Meta, 'name', cls.__name__)
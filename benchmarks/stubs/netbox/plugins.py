@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.template.loader import render_to_string
+
+
+class PluginConfig(AppConfig):
+    default_settings = {}
+
+
+class PluginTemplateExtension:
+    models = ()
+
+    def __init__(self, context):
+        self.context = context
+
+    def render(self, template_name, extra_context=None):
+        return render_to_string(template_name, {**self.context, **(extra_context or {})})
@@ -0,0 +1,4 @@
+class FieldSet:
+    def __init__(self, *fields, name=None):
+        self.fields = fields
+        self.name = name
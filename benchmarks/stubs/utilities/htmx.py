@@ -0,0 +1,2 @@
+def htmx_partial(request):
+    return request.headers.get('HX-Request') is not None
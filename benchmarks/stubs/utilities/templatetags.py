@@ -0,0 +1,8 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def meta(model, attr):
+    return getattr(model._meta, attr)
@@ -0,0 +1,125 @@
+"""REST API of the labels (`/api/plugins/netbox_qrcode/labels/`)."""
+import io
+import json
+import zipfile
+
+import pytest
+
+pytest.importorskip('rest_framework')
+
+from django.test import Client # noqa: E402
+from django.urls import reverse # noqa: E402
+
+from dcim.models import Device, Site # noqa: E402
+from netbox_qrcode import configs # noqa: E402
+
+
+@pytest.fixture
+def devices():
+    site = Site.objects.create(name='api-site')
+    Device.objects.bulk_create(Device(name=f'device-{index}', serial=f'SN{index}', site=site) for index in range(3))
+    yield list(Device.objects.order_by('pk'))
+    Device.objects.all().delete()
+    site.delete()
+
+
+@pytest.fixture
+def plugin_config(settings_config, monkeypatch):
+    # The NetBox configuration is used, the resolver is only rebuilt for another configuration object
+    monkeypatch.setitem(settings_config, 'device', {'text_fields': ['name']})
+    monkeypatch.setitem(settings_config, 'device_2', {'text_fields': ['serial']})
+    monkeypatch.setattr(configs, '_resolver', None)
+    return settings_config
+
+
+def get_labels(**params):
+    return Client().get(reverse('netbox_qrcode-api:labels'), dict({'model': 'device'}, **params))
+
+
+def content(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+@pytest.mark.parametrize('design, field', [(1, 'name'), (2, 'serial')])
+def test_json(devices, plugin_config, design, field):
+    response = get_labels(design=design, limit=2, offset=1)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data['count'] == len(devices)
+    assert [label['text'] for label in data['results']] == [getattr(device, field) for device in devices[1:3]]
+    assert all(label['qr_code']['format'] == 'png' for label in data['results'])
+
+
+def test_filters(devices, plugin_config):
+    # `model` is no filter of the objects (for devices it would be the device type model)
+    response = get_labels(id=[devices[0].pk, devices[2].pk])
+    assert response.status_code == 200
+    assert [label['text'] for label in response.json()['results']] == [devices[0].name, devices[2].name]
+
+    assert get_labels(model='interface').status_code == 400
+    assert get_labels(output='docx').status_code == 400
+    assert get_labels(design='first').status_code == 400
+
+
+@pytest.mark.parametrize('output', ['png', 'svg'])
+def test_zip(devices, plugin_config, output):
+    response = get_labels(output=output, design=2)
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/zip'
+
+    archive = zipfile.ZipFile(io.BytesIO(content(response)))
+    manifest = json.loads(archive.read('labels.json'))
+    assert [entry['text'] for entry in manifest] == [device.serial for device in devices]
+    assert sorted(archive.namelist()) == sorted([f'device_{device.pk}.{output}' for device in devices] + ['labels.json'])
+    if output == 'svg':
+        assert archive.read(manifest[0]['file']).startswith(b'<svg')
+    else:
+        assert archive.read(manifest[0]['file']).startswith(b'\x89PNG')
+
+
+def test_pdf(devices, plugin_config):
+    response = get_labels(output='pdf', label_height='29mm')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/pdf'
+    assert content(response).startswith(b'%PDF')
+
+    assert get_labels(output='pdf', label_height='1in').status_code == 400 # Mixed scales
+
+
+@pytest.mark.parametrize('design, field', [(1, 'name'), (2, 'serial')])
+def test_zpl(devices, plugin_config, design, field):
+    response = get_labels(output='zpl', design=design)
+    assert response.status_code == 200
+    zpl = content(response).decode('utf-8')
+
+    assert zpl.count('^BQN,2,') == len(devices)
+    for device in devices:
+        assert f'^FD{getattr(device, field)}^FS' in zpl
+
+
+@pytest.mark.parametrize('output', ['json', 'png', 'pdf', 'zpl'])
+def test_not_modified(devices, plugin_config, output):
+    params = {'model': 'device', 'output': output, 'label_height': '29mm'}
+    response = get_labels(**params)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    response = Client().get(reverse('netbox_qrcode-api:labels'), params, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+def test_etag(devices, plugin_config, monkeypatch):
+    etag = get_labels()['ETag']
+    assert get_labels()['ETag'] == etag
+    assert get_labels(design=2)['ETag'] != etag
+    assert get_labels(id=devices[0].pk)['ETag'] != etag
+
+    # Only the configuration of the requested design counts
+    monkeypatch.setitem(plugin_config, 'device_2', {'text_fields': ['name', 'serial']})
+    monkeypatch.setattr(configs, '_resolver', None)
+    assert get_labels()['ETag'] == etag
+
+    devices[1].save()
+    assert get_labels()['ETag'] != etag
@@ -0,0 +1,73 @@
+"""Resolution of the label configuration per model and label design."""
+from netbox_qrcode.configs import LabelConfig, LabelConfigResolver, get_label_config_resolver
+
+CONFIG = {
+    'with_text': True,
+    'font_size': '3mm',
+    'qr_box_size': 4,
+    'qr_format': 'png',
+    'qr_image_mode': 'inline',
+    'device': {'font_size': '4mm', 'qr_format': 'svg'},
+    'device_2': {'with_text': False},
+    'device_4': {'font_size': '9mm'}, # Not offered, device_3 is missing
+    'rack_2': {'font_size': '5mm'},
+}
+
+
+def test_section_overrides_global():
+    resolver = LabelConfigResolver(CONFIG)
+    device = resolver.resolve('device')
+    assert device['font_size'] == '4mm'
+    assert device['with_text'] is True
+    assert device.qr_format == 'svg'
+
+
+def test_design_section_overrides_global_only():
+    design = LabelConfigResolver(CONFIG).resolve('device', 2)
+    assert design['with_text'] is False
+    assert design['font_size'] == '3mm' # From the global configuration, not from `device`
+
+
+def test_missing_sections_use_global():
+    resolver = LabelConfigResolver(CONFIG)
+    assert resolver.resolve('cable') == resolver.default
+    assert resolver.resolve('device', 3) == resolver.default
+    assert resolver.resolve('rack')['font_size'] == '3mm'
+    assert resolver.resolve('rack', 2)['font_size'] == '5mm'
+
+
+def test_designs_are_an_unbroken_sequence():
+    resolver = LabelConfigResolver(CONFIG)
+    assert resolver.designs('device') == (1, 2)
+    assert resolver.designs('rack') == (1, 2)
+    assert resolver.designs('cable') == (1,)
+
+
+def test_qr_args():
+    config = LabelConfig.from_dict(CONFIG)
+    assert dict(config.qr_args) == {'box_size': 4}
+    assert config.qr_format == 'png'
+
+
+def test_digest_is_stable():
+    reordered = dict(reversed(list(CONFIG.items())))
+    assert LabelConfig.from_dict(CONFIG).digest == LabelConfig.from_dict(reordered).digest
+    assert LabelConfigResolver(CONFIG).resolve('device').digest == LabelConfigResolver(dict(CONFIG)).resolve('device').digest
+    assert LabelConfig.from_dict(CONFIG).digest != LabelConfig.from_dict(dict(CONFIG, font_size='3.5mm')).digest
+
+
+def test_digest_of_design():
+    config = dict(CONFIG, device={'text_fields': ['name']}, device_2={'text_fields': ['serial']})
+    digest = LabelConfigResolver(config).resolve('device').digest
+
+    # Other designs and models don't change the label of a design
+    assert LabelConfigResolver(dict(config, device_2={'text_fields': []})).resolve('device').digest == digest
+    assert LabelConfigResolver(dict(config, rack={'font_size': '1mm'})).resolve('device').digest == digest
+    assert LabelConfigResolver(dict(config, device={'text_fields': ['serial']})).resolve('device').digest != digest
+
+
+def test_resolver_rebuilt_for_other_config():
+    config = dict(CONFIG)
+    resolver = get_label_config_resolver(config)
+    assert get_label_config_resolver(config) is resolver
+    assert get_label_config_resolver(dict(CONFIG)) is not resolver
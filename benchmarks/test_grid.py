@@ -0,0 +1,38 @@
+"""Layout of the labels on the print sheets."""
+import pytest
+
+from netbox_qrcode.grid import GridPosition
+
+
+def make_grid(elements):
+    # Default page layout: A4 with 3 x 9 labels of 64 x 29 mm
+    return GridPosition(
+        rows=9, columns=3, elements=elements,
+        element_height=29, element_width=64,
+        grid_width=210 - 12, grid_height=297 - 28,
+    )
+
+
+@pytest.mark.benchmark(group='GridPosition')
+def test_grid_create(benchmark):
+    benchmark(make_grid, 1000)
+
+
+@pytest.mark.benchmark(group='GridPosition')
+@pytest.mark.parametrize('elements', [27, 1000, 10000])
+def test_grid_layout(benchmark, elements):
+    grid = make_grid(elements)
+
+    def layout():
+        return [grid.elementCoordinates(index, by_row=True) for index in range(1, elements + 1)]
+
+    benchmark(layout)
+
+
+@pytest.mark.benchmark(group='GridPosition')
+@pytest.mark.parametrize('order', ['row', 'column', 'serpentine'])
+@pytest.mark.parametrize('elements', [27, 1000, 10000])
+def test_grid_batch_layout(benchmark, elements, order):
+    grid = make_grid(elements)
+    layout = benchmark(grid.layout, elements, start=5, order=order)
+    assert len(layout) == elements
@@ -0,0 +1,50 @@
+"""
+Import time of the plugin. Processes which never create a label (manage.py commands,
+background workers) must not load the image libraries or the classes of the print views.
+Measured with `python -X importtime` in a fresh interpreter.
+"""
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules which are only loaded when labels are created or a print view is requested
+LAZY_MODULES = ('qrcode', 'PIL', 'numpy', 'concurrent.futures.process', 'dcim.filtersets', 'dcim.forms', 'dcim.tables')
+
+# Budget for the modules of the plugin itself (sum of their own import times)
+BUDGET_MS = 100
+
+# Django set up with the plugin (as by manage.py), then the URLs of the plugin (web process)
+SCRIPT = """
+import sys
+sys.path[:0] = sys.argv[1:]
+import benchmark_settings
+benchmark_settings.configure()
+import netbox_qrcode.urls
+print(' '.join(sys.modules))
+"""
+
+
+def import_plugin():
+    """Return the loaded modules and the import time in ms of each plugin module."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, os.path.join(HERE, 'stubs'), os.path.dirname(HERE)],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip().startswith('netbox_qrcode'):
+            times[name.strip()] = int(own) / 1000
+    return set(result.stdout.split()), times
+
+
+def test_import_time():
+    modules, times = import_plugin()
+
+    loaded = [name for name in LAZY_MODULES if name in modules]
+    assert not loaded, f"Loaded on import: {', '.join(loaded)}"
+    assert sum(times.values()) < BUDGET_MS, f"Import of the plugin takes {sum(times.values()):.1f} ms: {times}"
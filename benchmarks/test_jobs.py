@@ -0,0 +1,51 @@
+"""Access to background print jobs."""
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory
+
+from netbox_qrcode import views
+from netbox_qrcode.jobs import PrintLabelsJob
+
+JOB_VIEWS = [
+    ('post', views.QRCodePrintJobView, {}),
+    ('get', views.QRCodePrintJobStatusView, {'pk': 1}),
+    ('get', views.QRCodePrintJobDownloadView, {'pk': 1}),
+]
+
+
+@pytest.fixture
+def users():
+    user = User.objects.create_user('printer')
+    superuser = User.objects.create_superuser('admin')
+    yield user, superuser
+    User.objects.all().delete()
+
+
+@pytest.mark.parametrize('method, view, kwargs', JOB_VIEWS, ids=lambda value: getattr(value, '__name__', ''))
+def test_login_required(method, view, kwargs):
+    request = getattr(RequestFactory(), method)('/plugins/qrcode/print/job/')
+    request.user = AnonymousUser()
+
+    with mock.patch.object(views, 'get_object_or_404') as get_object_or_404:
+        response = view.as_view()(request, **kwargs)
+
+    assert response.status_code == 302
+    assert '/login/' in response.url
+    get_object_or_404.assert_not_called()
+
+
+def test_jobs_of_the_user(users):
+    user, superuser = users
+    request = RequestFactory().get('/')
+
+    with mock.patch.object(views, 'get_object_or_404') as get_object_or_404:
+        request.user = user
+        views.get_print_job(request, 1)
+        get_object_or_404.assert_called_with(views.Job, pk=1, name=PrintLabelsJob.name, user=user)
+
+        request.user = superuser
+        views.get_print_job(request, 1)
+        get_object_or_404.assert_called_with(views.Job, pk=1, name=PrintLabelsJob.name)
+
@@ -0,0 +1,156 @@
+"""Fragment cache of rendered labels (`cache_labels`)."""
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from dcim.models import Cable, CableTermination, Device, Interface, Site
+from netbox_qrcode.cache import evict_labels, get_label_version, make_label_key
+from netbox_qrcode.printing import LabelBatch, get_print_models
+from netbox_qrcode.signals import connect_signals, evict_device_cable_labels
+from netbox_qrcode.template_content import DeviceQRCode
+
+
+@pytest.fixture
+def devices():
+    site = Site.objects.create(name='label-cache-site')
+    Device.objects.bulk_create(Device(name=f'device-{index}', site=site) for index in range(3))
+    yield list(Device.objects.order_by('pk'))
+    Device.objects.all().delete()
+    site.delete()
+
+
+@pytest.fixture
+def label_cache(settings_config, monkeypatch):
+    monkeypatch.setitem(settings_config, 'cache_labels', True)
+    cache = caches['default']
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def render_calls():
+    with mock.patch.object(DeviceQRCode, 'Render_SubPluginContent', autospec=True,
+                           side_effect=DeviceQRCode.Render_SubPluginContent) as render:
+        yield render
+
+
+def render_labels(devices, plugin_config):
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    batch = LabelBatch('device', [str(device.pk) for device in devices], {}, request, plugin_config)
+    return [html for index, obj, html in batch.iter_labels()]
+
+
+def test_label_key(devices):
+    device = devices[0]
+    key = make_label_key(device, 1, 'digest')
+
+    assert make_label_key(device, 1, 'digest') == key
+    assert make_label_key(devices[1], 1, 'digest') != key
+    assert make_label_key(device, 2, 'digest') != key
+    assert make_label_key(device, 1, 'other digest') != key
+
+    device.last_updated += timedelta(seconds=1)
+    assert make_label_key(device, 1, 'digest') != key
+
+
+def test_labels_rendered_once(devices, settings_config, label_cache, render_calls):
+    labels = render_labels(devices, settings_config)
+    assert render_calls.call_count == len(devices)
+
+    assert render_labels(devices, settings_config) == labels
+    assert render_calls.call_count == len(devices)
+
+
+def test_configuration_change(devices, settings_config, label_cache, render_calls):
+    render_labels(devices, settings_config)
+    render_labels(devices, dict(settings_config, device={'text_fields': ['name']}))
+    assert render_calls.call_count == 2 * len(devices)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def signals():
+    connect_signals(model for model, extension_class in get_print_models().values())
+
+
+@pytest.fixture
+def cable(devices):
+    device = devices[0]
+    interface = Interface.objects.create(name='eth0', device=device)
+    cable = Cable.objects.create(name='cable-1')
+    CableTermination.objects.create(
+        cable=cable, cable_end='A', termination_type=ContentType.objects.get_for_model(Interface),
+        termination_id=interface.pk, _device=device,
+    )
+    interface.cable = cable
+    interface.save()
+    yield cable
+    cable.delete()
+    interface.delete()
+
+
+def version(obj):
+    return get_label_version(caches['default'], obj, None)
+
+
+def test_label_version(devices, label_cache):
+    device = devices[0]
+    first = version(device)
+    assert version(device) == first
+    assert version(devices[1]) != first
+
+    evict_labels('dcim.device', [device.pk])
+    assert version(device) != first
+
+
+def test_label_version_added_meanwhile(devices, label_cache):
+    device = devices[0]
+    with mock.patch.object(label_cache, 'get', side_effect=[None, 'other']), \
+            mock.patch.object(label_cache, 'add', return_value=False):
+        assert get_label_version(label_cache, device, None) == 'other'
+
+
+def test_object_changed(devices, settings_config, label_cache, render_calls):
+    render_labels(devices, settings_config)
+    first = version(devices[0])
+
+    devices[0].save()
+    assert version(devices[0]) != first
+    render_labels(devices, settings_config)
+    assert render_calls.call_count == len(devices) + 1
+
+
+def test_device_changed(devices, cable, label_cache):
+    first = version(cable)
+    devices[1].save() # Not connected
+    assert version(cable) == first
+
+    devices[0].save()
+    assert version(cable) != first
+
+
+def test_termination_changed(devices, cable, label_cache):
+    first = version(cable)
+    interface = Interface.objects.get(cable=cable)
+    interface.name = 'eth1'
+    interface.save()
+    assert version(cable) != first
+
+    second = version(cable)
+    cable.terminations.get().save()
+    assert version(cable) != second
+
+
+def test_device_changed_without_label_cache(devices, cable, settings_config):
+    assert not settings_config.get('cache_labels')
+    with CaptureQueriesContext(connection) as queries:
+        evict_device_cable_labels(Device, devices[0])
+    assert len(queries) == 0
@@ -0,0 +1,93 @@
+"""End-to-end print preview (HTML, PDF and ZPL) for synthetic devices."""
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from dcim.models import Device, Site
+from netbox_qrcode.cache import get_qr_cache
+from netbox_qrcode.selection import save_selection
+from netbox_qrcode.views import QRCodePrintPreviewView
+
+SIZES = [10, 1000, 10000]
+
+# 3 x 9 labels on A4, the default label height doesn't fit 9 rows
+LAYOUT = {'label_width': '64mm', 'label_height': '29mm'}
+
+
+@pytest.fixture(scope='module')
+def site():
+    site = Site.objects.create(name='preview-site')
+    yield site
+    site.delete()
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f'objects={size}')
+def selection(request, site):
+    size = request.param
+    Device.objects.bulk_create(
+        Device(name=f'device-{index}', serial=f'SN{index:08}', site=site) for index in range(size)
+    )
+    pk_list = [str(pk) for pk in Device.objects.values_list('pk', flat=True)]
+    yield size, save_selection(AnonymousUser(), 'device', pk_list)
+    Device.objects.all().delete()
+
+
+def get_preview(token, **params):
+    request = RequestFactory().get('/plugins/qrcode/print/preview/', {'selection': token, **LAYOUT, **params})
+    request.user = AnonymousUser()
+    response = QRCodePrintPreviewView.as_view()(request)
+    assert response.status_code == 200
+    content = b''.join(response) if response.streaming else response.content
+    get_qr_cache().clear() # Measure the encoding of every QR code
+    return content
+
+
+@pytest.fixture
+def all_sheets():
+    """Create all sheets with the page instead of loading them on demand."""
+    plugin_config = settings.PLUGINS_CONFIG['netbox_qrcode']
+    plugin_config['preview_lazy_pages'] = False
+    yield
+    plugin_config['preview_lazy_pages'] = True
+
+
+def rounds(size):
+    return 1 if size >= 10000 else 3
+
+
+@pytest.mark.benchmark(group='print preview')
+def test_preview_html(benchmark, selection, all_sheets):
+    size, token = selection
+    content = benchmark.pedantic(get_preview, args=(token,), rounds=rounds(size), warmup_rounds=0)
+    assert content.count(b'<div class="qr-label-qr">') == size
+
+
+@pytest.mark.benchmark(group='print preview')
+def test_preview_first_sheet(benchmark, selection):
+    size, token = selection
+    content = benchmark.pedantic(get_preview, args=(token,), rounds=3, warmup_rounds=0)
+    assert content.count(b'<div class="qr-label-qr">') == min(size, 27)
+
+
+@pytest.mark.benchmark(group='print preview')
+def test_preview_last_sheet(benchmark, selection):
+    size, token = selection
+    page = -(-size // 27)
+    content = benchmark.pedantic(get_preview, args=(token,), kwargs={'page': page}, rounds=3, warmup_rounds=0)
+    assert content.count(b'<div class="qr-label-qr">') == size - (page - 1) * 27
+
+
+@pytest.mark.benchmark(group='print preview')
+def test_preview_pdf(benchmark, selection):
+    size, token = selection
+    content = benchmark.pedantic(get_preview, args=(token,), kwargs={'output': 'pdf'}, rounds=rounds(size), warmup_rounds=0)
+    assert content.startswith(b'%PDF')
+
+
+@pytest.mark.benchmark(group='print preview')
+def test_preview_zpl(benchmark, selection):
+    size, token = selection
+    content = benchmark.pedantic(get_preview, args=(token,), kwargs={'output': 'zpl'}, rounds=rounds(size), warmup_rounds=0)
+    assert content.count(b'^XA') == size + 1 # Printer settings and one format per label
+    assert content.count(b'^BQN,2,') == size
@@ -0,0 +1,252 @@
+"""Labels of a print batch."""
+import re
+import zlib
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.urls import reverse
+
+from dcim.models import Device, Site
+from netbox_qrcode import cache, encoding, jobs, pdf, template_content_functions, views
+from netbox_qrcode.cache import QRImageCache
+from netbox_qrcode.encoding import QREncoderPool, encode_qr
+from netbox_qrcode.jobs import PrintLabelsJob
+from netbox_qrcode.printing import SHEETS_PLACEHOLDER, LabelBatch, split_sheets
+from netbox_qrcode.selection import save_selection
+
+
+@pytest.fixture
+def devices():
+    site = Site.objects.create(name='printing-site')
+    Device.objects.bulk_create(Device(name=f'device-{index}', serial=f'SN{index}', site=site) for index in range(3))
+    yield [str(pk) for pk in Device.objects.order_by('pk').values_list('pk', flat=True)]
+    Device.objects.all().delete()
+    site.delete()
+
+
+@pytest.fixture
+def plugin_config(settings_config):
+    # The design number must not be confused with the primary key of the objects
+    return dict(settings_config, device={'text_fields': ['name']}, device_2={'text_fields': ['serial']})
+
+
+@pytest.fixture
+def request_():
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    return request
+
+
+@pytest.mark.parametrize('design, field', [(1, 'name'), (2, 'serial')])
+def test_design_of_all_labels(devices, plugin_config, request_, design, field):
+    batch = LabelBatch('device', devices, {}, request_, plugin_config, design=design)
+    expected = [getattr(obj, field) for obj in Device.objects.order_by('pk')]
+
+    assert [label.text for index, label in batch.iter_pdf_labels()] == expected
+    for (index, obj, html), text in zip(batch.iter_labels(), expected):
+        assert text in html
+
+
+@pytest.fixture
+def qr_cache(monkeypatch):
+    """A QR image cache which keeps nothing in the process, and the default cache as shared tier."""
+    qr_cache = QRImageCache(maxsize=0, backend='default')
+    monkeypatch.setattr(cache, '_qr_cache', qr_cache)
+    yield qr_cache
+    caches['default'].clear()
+
+
+OUTPUTS = {
+    'html': lambda batch: list(batch.iter_labels()),
+    'pdf': lambda batch: b''.join(batch.render_pdf()),
+    'png': lambda batch: list(batch.iter_qr_images()),
+}
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    """The worker processes started by a test, shut down afterwards."""
+    monkeypatch.setattr(encoding, '_executor', None)
+    with mock.patch.object(encoding, 'get_executor', wraps=encoding.get_executor) as get_executor:
+        yield get_executor
+    if encoding._executor is not None:
+        encoding._executor[1].shutdown()
+
+
+@pytest.mark.parametrize('output', OUTPUTS.values(), ids=OUTPUTS.keys())
+def test_encoded_in_advance(devices, plugin_config, request_, qr_cache, executor, output):
+    batch = LabelBatch('device', devices, {}, request_, dict(plugin_config, encode_workers=2, encode_threshold=2))
+    with mock.patch.object(template_content_functions, 'encode_qr', wraps=encode_qr) as encode, \
+            mock.patch.object(pdf, 'encode_qr', wraps=encode_qr) as encode_pdf:
+        output(batch)
+
+    # The images of the worker processes are used, although the cache can't hold them
+    executor.assert_called()
+    encode.assert_not_called()
+    encode_pdf.assert_not_called()
+
+
+def test_executor_reused(devices, plugin_config, request_, qr_cache, executor):
+    config = dict(plugin_config, encode_workers=2, encode_threshold=2)
+    started = []
+    for index in range(2):
+        caches['default'].clear() # Encode the QR codes again
+        list(LabelBatch('device', devices, {}, request_, config).iter_labels())
+        started.append(encoding._executor[1])
+
+    assert executor.call_count == 2
+    assert started[0] is started[1]
+
+
+def test_encode_threshold(devices, plugin_config, request_, qr_cache, executor):
+    # A lazily loaded sheet is encoded in the web process
+    batch = LabelBatch('device', devices, {}, request_, dict(plugin_config, encode_workers=2))
+    assert len(list(batch.iter_labels())) == len(devices)
+    executor.assert_not_called()
+
+
+def test_executor_reset_after_fork(executor):
+    first = encoding.get_executor(1)
+    assert encoding.get_executor(1) is first
+
+    encoding._reset_executor() # As in a forked child
+    second = encoding.get_executor(1)
+    assert second is not first
+    first.shutdown()
+
+
+def test_encode_shared(qr_cache, executor):
+    item = ('https://netbox/dcim/devices/1/', {'box_size': 2}, 'svg')
+    key = qr_cache.make_key(item[0], dict(item[1], format='svg'))
+    qr_cache.set(key, '<svg/>')
+
+    assert QREncoderPool(2, threshold=2).encode([item, item]) == {key: '<svg/>'}
+    executor.assert_not_called()
+    assert qr_cache.shared_hits == 1
+
+
+def test_split_sheets():
+    assert split_sheets(f'<main>{SHEETS_PLACEHOLDER}</main>') == ('<main>', '</main>')
+    assert split_sheets('<main></main>') is None
+    assert split_sheets(f'{SHEETS_PLACEHOLDER}<main>{SHEETS_PLACEHOLDER}</main>') is None
+
+
+# Template overrides which lost the placeholder or show it twice
+OVERRIDES = {
+    'missing': lambda page: page.replace(SHEETS_PLACEHOLDER, ''),
+    'twice': lambda page: page.replace(SHEETS_PLACEHOLDER, SHEETS_PLACEHOLDER * 2),
+}
+
+
+@pytest.fixture(params=OVERRIDES.values(), ids=OVERRIDES.keys())
+def override(request):
+    return lambda *args, **kwargs: request.param(render_to_string(*args, **kwargs))
+
+
+def test_streaming_preview_without_placeholder(devices, settings_config, monkeypatch, override):
+    monkeypatch.setitem(settings_config, 'preview_streaming', True)
+    token = save_selection(AnonymousUser(), 'device', devices)
+    request = RequestFactory().get('/plugins/qrcode/print/preview/', {'selection': token})
+    request.user = AnonymousUser()
+
+    with mock.patch.object(views, 'render_to_string', override):
+        response = views.QRCodePrintPreviewView.as_view()(request)
+
+    assert response.status_code == 200
+    assert not response.streaming
+    assert response.content.count(b'<div class="qr-label-qr">') == len(devices)
+
+
+def test_html_document_without_placeholder(devices, settings_config, request_, override):
+    batch = LabelBatch('device', devices, {}, request_, settings_config)
+    with mock.patch.object(jobs, 'render_to_string', override):
+        document = ''.join(PrintLabelsJob.render_html(batch))
+
+    assert document.count('<div class="qr-label-qr">') == len(devices)
+
+
+@pytest.mark.parametrize('params, message', [
+    ({'blank_spaces': 'two'}, 'whole numbers'),
+    ({'start_position': '1.5'}, 'whole numbers'),
+    ({'fill_order': 'diagonal'}, 'Unknown fill order'),
+    ({'label_width': 'wide'}, 'Invalid print setting'),
+    ({'label_width': '2in'}, 'Mixed scale'),
+])
+def test_invalid_print_settings(devices, request_, params, message):
+    with pytest.raises(ValueError, match=message):
+        LabelBatch('device', devices, params, request_)
+
+
+@pytest.fixture
+def user():
+    user = User.objects.create_user('label-printer')
+    yield user
+    user.delete()
+
+
+def invalid_settings_request(method, user, **params):
+    request = getattr(RequestFactory(), method)('/', dict(params, blank_spaces='two'))
+    request.user = user
+    request._messages = CookieStorage(request)
+    return request
+
+
+def test_preview_invalid_print_settings(devices):
+    token = save_selection(AnonymousUser(), 'device', devices)
+    request = invalid_settings_request('get', AnonymousUser(), selection=token)
+    response = views.QRCodePrintPreviewView.as_view()(request)
+
+    assert response.status_code == 302
+    assert response.url == f"{reverse('plugins:netbox_qrcode:qrcode_print_preview')}?selection={token}"
+    assert [str(message) for message in request._messages] == ["Blank labels and start position must be whole numbers."]
+
+    request = invalid_settings_request('get', AnonymousUser(), selection=token)
+    request.META['HTTP_HX_REQUEST'] = 'true'
+    response = views.QRCodePrintPreviewView.as_view()(request)
+    assert response.status_code == 400
+
+
+def test_job_invalid_print_settings(devices, settings_config, monkeypatch, user):
+    monkeypatch.setitem(settings_config, 'print_jobs', True)
+    token = save_selection(user, 'device', devices)
+    request = invalid_settings_request('post', user, selection=token)
+    with mock.patch.object(PrintLabelsJob, 'enqueue', create=True) as enqueue:
+        response = views.QRCodePrintJobView.as_view()(request)
+
+    assert response.status_code == 302
+    assert [str(message) for message in request._messages] == ["Blank labels and start position must be whole numbers."]
+    enqueue.assert_not_called()
+
+
+# A 100 x 60 mm sheet of 2 x 2 labels of 40 x 25 mm: 5 mm between the columns, 1 mm between the rows
+SHEET = {
+    'page_width': '100mm', 'page_height': '60mm', 'page_rows': '2', 'page_columns': '2',
+    'page_left_margin': '5mm', 'page_right_margin': '5mm', 'page_top_margin': '4mm', 'page_bottom_margin': '4mm',
+    'label_width': '40mm', 'label_height': '25mm',
+}
+
+
+def test_pdf_label_positions(devices, plugin_config, request_):
+    batch = LabelBatch('device', devices, dict(SHEET, start_position='2'), request_, plugin_config)
+    # The QR code fills the label
+    with mock.patch.object(pdf, 'label_boxes', side_effect=lambda config, width, height: ((0, 0, width, height), None)):
+        document = b''.join(batch.render_pdf())
+    content = b''.join(
+        zlib.decompress(match.group(2)[:int(match.group(1))])
+        for match in re.finditer(rb'<< /Length (\d+) /Filter /FlateDecode >>\nstream\n(.*?)\nendstream', document, re.S)
+    )
+
+    mm = 72 / 25.4
+    corners = [
+        (float(x) / mm, 60 - (float(y) + float(height)) / mm) # Top left corner, from the top of the page
+        for width, height, x, y in re.findall(rb'q (\S+) 0 0 (\S+) (\S+) (\S+) cm /Im', content)
+    ]
+    # As the HTML sheet: the first row and column at the page margins, the spacing after each label
+    assert corners[0] == (pytest.approx(5 + 45, abs=0.01), pytest.approx(4, abs=0.01))
+    assert corners[-1] == (pytest.approx(5 + 45, abs=0.01), pytest.approx(4 + 26, abs=0.01))
+    assert corners[1] == (pytest.approx(5, abs=0.01), pytest.approx(4 + 26, abs=0.01))
@@ -0,0 +1,115 @@
+"""QR code encoding and PNG/Base64/SVG conversion."""
+import re
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from netbox_qrcode import utilities
+from netbox_qrcode.configs import LabelConfig
+from netbox_qrcode.template_content_functions import create_QRCode
+from netbox_qrcode.utilities import fit_qr_version, get_img_b64, get_qr, get_qr_svg, make_qr
+
+PAYLOAD = 'https://netbox.example.com/dcim/devices/1234/'
+
+
+@pytest.mark.benchmark(group='get_qr')
+@pytest.mark.parametrize('error_correction', [0, 1, 2, 3])
+@pytest.mark.parametrize('box_size', [1, 4, 10])
+def test_get_qr(benchmark, box_size, error_correction):
+    benchmark(get_qr, PAYLOAD, version=1, box_size=box_size, border=0, error_correction=error_correction)
+
+
+@pytest.mark.benchmark(group='get_img_b64')
+@pytest.mark.parametrize('box_size', [1, 4, 10])
+def test_get_img_b64(benchmark, box_size):
+    image = get_qr(PAYLOAD, version=1, box_size=box_size, border=0)
+    benchmark(get_img_b64, image)
+
+
+def svg_modules(svg):
+    """Return the dark modules drawn by the path of an SVG QR code as set of (x, y)."""
+    path = ET.fromstring(svg).find('{http://www.w3.org/2000/svg}path').get('d')
+    modules = set()
+    x = 0
+    for command, dx, dy, width in re.findall(r'([Mm])(-?\d+) (\d+)(?:\.5)?h(\d+)', path):
+        if command == 'M':
+            x, y = int(dx), int(dy)
+        else:
+            x += int(dx)
+        modules.update((column, y) for column in range(x, x + int(width)))
+        x += int(width)
+    return modules
+
+
+@pytest.mark.parametrize('border', [0, 4])
+@pytest.mark.parametrize('error_correction', [0, 1, 2, 3])
+def test_svg_matches_matrix(border, error_correction):
+    svg = get_qr_svg(PAYLOAD, border=border, error_correction=error_correction)
+    matrix = make_qr(PAYLOAD, border=border, error_correction=error_correction).get_matrix()
+    size = len(matrix)
+
+    assert ET.fromstring(svg).get('viewBox') == f'0 0 {size} {size}'
+    assert svg_modules(svg) == {(x, y) for y, row in enumerate(matrix) for x, dark in enumerate(row) if dark}
+
+
+def test_create_qrcode_formats():
+    config = {'qr_version': 1, 'qr_box_size': 2, 'qr_border': 1, 'qr_error_correction': 0}
+    svg = create_QRCode(PAYLOAD, LabelConfig.from_dict(dict(config, qr_format='svg')))
+    png = create_QRCode(PAYLOAD, LabelConfig.from_dict(dict(config, qr_format='png')))
+
+    assert svg.startswith('<svg ')
+    assert svg_modules(svg) == svg_modules(get_qr_svg(PAYLOAD, version=1, box_size=2, border=1, error_correction=0))
+    assert png == get_img_b64(get_qr(PAYLOAD, version=1, box_size=2, border=1, error_correction=0))
+
+
+def reference_qr(text, strict_version=False, **kwargs):
+    """The QR code as the qrcode package creates it, without the version memo."""
+    import qrcode
+    from qrcode.exceptions import DataOverflowError
+
+    qr = qrcode.QRCode(**kwargs)
+    qr.add_data(text)
+    if strict_version and qr.version:
+        try:
+            qr.make(fit=False)
+            return qr
+        except DataOverflowError:
+            qr.data_cache = None
+    qr.make(fit=True)
+    return qr
+
+
+@pytest.fixture
+def fitted_versions(monkeypatch):
+    monkeypatch.setattr(utilities, '_fitted_versions', {})
+
+
+TEXTS = [
+    '1234567890' * 3, # Numeric
+    'HTTPS://NETBOX.EXAMPLE.COM/DCIM/DEVICES/1/', # Alphanumeric
+    PAYLOAD,
+    PAYLOAD + 'x' * 200,
+]
+
+
+@pytest.mark.parametrize('text', TEXTS, ids=['numeric', 'alphanumeric', 'url', 'long'])
+@pytest.mark.parametrize('error_correction', [0, 1, 2, 3])
+@pytest.mark.parametrize('version', [None, 1, 5])
+@pytest.mark.parametrize('strict_version', [False, True])
+def test_fitted_version(fitted_versions, text, error_correction, version, strict_version):
+    kwargs = dict(version=version, error_correction=error_correction, border=0, strict_version=strict_version)
+    expected = reference_qr(text, **kwargs)
+
+    for attempt in range(2): # Searched, then from the memo
+        qr = make_qr(text, **kwargs)
+        assert qr.version == expected.version
+        assert qr.get_matrix() == expected.get_matrix()
+        assert fit_qr_version(text, **kwargs) == expected.version
+
+
+def test_fitted_version_of_same_length(fitted_versions):
+    # URLs of the same length share the memo entry
+    first = make_qr(PAYLOAD, error_correction=2)
+    other = make_qr(PAYLOAD.replace('1234', '5678'), error_correction=2)
+    assert len(utilities._fitted_versions) == 1
+    assert other.version == first.version == reference_qr(PAYLOAD, error_correction=2).version
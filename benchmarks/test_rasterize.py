@@ -0,0 +1,26 @@
+"""
+Rendering of PNG QR codes: PIL drawer (qr.make_image) vs. NumPy rasterizer.
+
+    pytest benchmarks/test_rasterize.py --benchmark-group-by=param
+"""
+import pytest
+
+from netbox_qrcode.utilities import make_qr, rasterize_qr
+
+pytest.importorskip('numpy')
+
+PAYLOAD = 'https://netbox.example.com/dcim/devices/1234/'
+
+
+@pytest.fixture(params=[1, 4, 10], ids=lambda box_size: f'box_size={box_size}')
+def qr(request):
+    return make_qr(PAYLOAD, box_size=request.param, border=4)
+
+
+def test_pil_drawer(benchmark, qr):
+    benchmark(lambda: qr.make_image().get_image())
+
+
+def test_numpy_rasterizer(benchmark, qr):
+    image = benchmark(rasterize_qr, qr)
+    assert image.tobytes() == qr.make_image().get_image().tobytes()
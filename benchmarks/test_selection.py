@@ -0,0 +1,54 @@
+"""Print selections stored on the server behind a token."""
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import RequestFactory
+
+from netbox_qrcode.selection import KEY_PREFIX, load_selection, save_selection
+from netbox_qrcode.views import get_selection
+
+ALICE = SimpleNamespace(pk=1)
+BOB = SimpleNamespace(pk=2)
+
+
+def test_round_trip():
+    token = save_selection(ALICE, 'device', ['3', '1', '2'])
+    assert len(token) < 20
+    assert load_selection(ALICE, token) == ('device', ['3', '1', '2'])
+
+
+def test_other_user_cannot_load():
+    token = save_selection(ALICE, 'device', ['1'])
+    assert load_selection(BOB, token) is None
+
+
+def test_unknown_or_expired_token():
+    token = save_selection(ALICE, 'device', ['1'])
+    cache.delete(KEY_PREFIX + token)
+    assert load_selection(ALICE, token) is None
+    assert load_selection(ALICE, 'unknown') is None
+
+
+def test_load_extends_lifetime(settings_config):
+    token = save_selection(ALICE, 'device', ['1'])
+    settings_config['selection_timeout'] = 60
+    try:
+        with mock.patch.object(caches['default'], 'touch', wraps=caches['default'].touch) as touch:
+            load_selection(ALICE, token)
+        touch.assert_called_once_with(KEY_PREFIX + token, 60)
+    finally:
+        settings_config['selection_timeout'] = 3600
+
+
+def test_get_selection():
+    token = save_selection(ALICE, 'rack', ['5'])
+    request = RequestFactory().get('/', {'selection': token})
+    request.user = ALICE
+    assert get_selection(request, request.GET) == (token, 'rack', ['5'])
+
+    request.user = BOB
+    assert get_selection(request, request.GET) == (token, None, None)
+
+    legacy = RequestFactory().get('/', {'model': 'device', 'pk': ['1', '2']})
+    assert get_selection(legacy, legacy.GET) == (None, 'device', ['1', '2'])
@@ -0,0 +1,267 @@
+"""Sending labels to network printers, against a fake printer on a local socket."""
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.test import RequestFactory
+
+from dcim.models import Cable
+from netbox_qrcode.printing import LabelBatch
+from netbox_qrcode.spooler import Printer, PrinterError, PrinterStatus, get_printer
+from netbox_qrcode.views import QRCodePrinterStatusView
+
+CABLES = 2000
+
+
+def host_status(formats_in_buffer=0, paper_out=False):
+    """Answer to ~HS of a Zebra printer."""
+    return (
+        f'\x02030,{int(paper_out)},0,0256,{formats_in_buffer:03},0,0,0,000,0,0,0\x03\r\n'
+        '\x02001,0,0,0,1,2,6,0,00000000,1,000\x03\r\n'
+        '\x021234,0\x03\r\n'
+    ).encode('ascii')
+
+
+class FakePrinter(socketserver.ThreadingTCPServer):
+    """
+    Receives raw print data like a label printer on port 9100 and answers ~HS (unless
+    `silent`). The formats waiting in the receive buffer are reported from `pending` (one value
+    per query).
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), FakePrinterHandler)
+        self.received = bytearray()
+        self.connections = []
+        self.closed = 0
+        self.status_queries = 0
+        self.pending = []
+        self.silent = False
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def close_connections(self):
+        """Close the connections from the printer side, e.g. after a restart."""
+        for connection in self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass # Already closed by the client
+            connection.close()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.close_connections()
+
+
+class FakePrinterHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        printer = self.server
+        printer.connections.append(self.request)
+        while True:
+            try:
+                data = self.request.recv(65536)
+            except OSError:
+                return
+            if not data:
+                printer.closed += 1
+                return
+            if data.endswith(b'~HS'):
+                printer.received += data[:-3]
+                printer.status_queries += 1
+                if not printer.silent:
+                    self.request.sendall(host_status(printer.pending.pop(0) if printer.pending else 0))
+            else:
+                printer.received += data
+
+
+@pytest.fixture
+def fake_printer():
+    printer = FakePrinter()
+    yield printer
+    printer.stop()
+
+
+@pytest.fixture(autouse=True)
+def printer_state():
+    """The counters of the printers are kept in the cache."""
+    caches['default'].clear()
+    yield
+    caches['default'].clear()
+
+
+@pytest.fixture
+def printer(fake_printer):
+    return Printer('fake', '127.0.0.1', port=fake_printer.port, retry_delay=0.01)
+
+
+@pytest.fixture(scope='module')
+def cables():
+    Cable.objects.bulk_create(Cable(label=f'cable-{index}') for index in range(CABLES))
+    yield [str(pk) for pk in Cable.objects.order_by('pk').values_list('pk', flat=True)]
+    Cable.objects.all().delete()
+
+
+def wait_for(printer, size):
+    """Wait until the fake printer has received `size` bytes."""
+    deadline = time.monotonic() + 5
+    while len(printer.received) < size and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return bytes(printer.received)
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+@pytest.mark.benchmark(group='printer')
+def test_send_cable_labels(benchmark, fake_printer, printer, cables):
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+
+    def send():
+        fake_printer.received.clear()
+        fake_printer.connections.clear()
+        caches['default'].clear()
+        return printer.send(LabelBatch('cable', cables, {}, request).render_zpl())
+
+    sent = benchmark.pedantic(send, rounds=3, warmup_rounds=0)
+    received = wait_for(fake_printer, sent)
+    assert len(received) == sent
+    assert received.count(b'^BQN,2,') == CABLES
+    # One connection per job, a few large writes
+    assert len(fake_printer.connections) == 1
+    assert printer.get_state()['writes'] <= -(-sent // 65536)
+
+
+def test_batches_are_whole_labels(fake_printer, printer):
+    labels = [b'^XA^FDlabel %d^FS^XZ\n' % index for index in range(1000)]
+    printer.options['batch_size'] = 1000
+    sent = printer.send(labels)
+    assert wait_for(fake_printer, sent) == b''.join(labels)
+    assert printer.get_state()['writes'] <= -(-sent // 1000)
+
+
+def test_connection_per_job(fake_printer, printer):
+    printer.send([b'^XA^XZ\n'])
+    printer.send([b'^XA^FDagain^FS^XZ\n'])
+    assert wait_for(fake_printer, 24) == b'^XA^XZ\n^XA^FDagain^FS^XZ\n'
+
+    # Closed after each job, other clients can connect in between
+    assert len(fake_printer.connections) == 2
+    assert wait_until(lambda: fake_printer.closed == 2)
+
+
+def test_retry_until_printer_is_back():
+    printer = FakePrinter()
+    port = printer.port
+    printer.stop()
+    target = Printer('fake', '127.0.0.1', port=port, retries=5, retry_delay=0.05)
+    threading.Timer(0.1, lambda: restarted.append(FakePrinter(port))).start()
+    restarted = []
+    try:
+        sent = target.send([b'^XA^XZ\n'])
+        assert wait_for(restarted[0], sent) == b'^XA^XZ\n'
+        assert target.get_state()['reconnects'] >= 1
+    finally:
+        for printer in restarted:
+            printer.stop()
+
+
+def test_give_up_after_retries():
+    printer = FakePrinter()
+    port = printer.port
+    printer.stop()
+    target = Printer('fake', '127.0.0.1', port=port, retries=2, retry_delay=0.01)
+    with pytest.raises(PrinterError):
+        target.send([b'^XA^XZ\n'])
+
+    state = target.get_state()
+    assert state['reconnects'] == 2
+    assert state['last_error'] and state['last_error_time']
+    assert state['busy_since'] is None
+
+
+def test_wait_while_printer_buffer_is_full(fake_printer, printer):
+    printer.options.update(max_pending=5, batch_size=1)
+    fake_printer.pending = [10, 8, 3]
+    sent = printer.send([b'^XA^XZ\n', b'^XA^XZ\n'])
+    assert wait_for(fake_printer, sent) == b'^XA^XZ\n^XA^XZ\n'
+    # Three queries until the first batch, one for the second
+    assert fake_printer.status_queries == 4
+
+
+def test_state_shared(fake_printer, printer):
+    """The counters are the same for every process, e.g. a background worker and the web server."""
+    sent = printer.send([b'^XA^XZ\n'] * 3)
+    state = Printer('fake', '127.0.0.1', port=fake_printer.port).get_state()
+    assert state['bytes_sent'] == sent
+    assert state['writes'] == 1
+
+
+def test_status(fake_printer, printer):
+    fake_printer.pending = [2]
+    state = printer.get_status()
+    assert state['status'] == PrinterStatus(
+        paper_out=False, paused=False, formats_in_buffer=2, buffer_full=False,
+        head_up=False, ribbon_out=False, labels_remaining=0,
+    )
+    assert not state['status'].problems
+    assert PrinterStatus.parse(host_status(paper_out=True)).problems == ['Paper out']
+
+    # The connection is only kept for the query
+    assert wait_until(lambda: fake_printer.closed == 1)
+
+
+def test_status_timeout(fake_printer, printer):
+    fake_printer.silent = True
+    printer.options['status_timeout'] = 0.1
+    start = time.monotonic()
+    state = printer.get_status()
+    assert state['error']
+    assert time.monotonic() - start < 1
+
+
+def test_no_status_while_printing(fake_printer, printer):
+    states = []
+
+    def labels():
+        yield b'^XA^XZ\n'
+        # Another process shows the status page meanwhile
+        states.append(Printer('fake', '127.0.0.1', port=fake_printer.port).get_status())
+        yield b'^XA^XZ\n'
+
+    printer.options['batch_size'] = 1
+    printer.send(labels())
+    assert states[0]['busy'] and states[0]['busy_since']
+    assert states[0]['status'] is None
+    assert fake_printer.status_queries == 0
+    assert wait_until(lambda: len(fake_printer.connections) == 1)
+    assert not printer.get_status()['busy']
+
+
+def test_status_view(fake_printer, settings_config, monkeypatch):
+    monkeypatch.setitem(settings_config, 'printers', {'zebra': {'host': '127.0.0.1', 'port': fake_printer.port}})
+    get_printer('zebra').send([b'^XA^XZ\n'])
+
+    request = RequestFactory().get('/plugins/qrcode/printers/')
+    request.user = type('User', (), {'is_authenticated': True})()
+    response = QRCodePrinterStatusView.as_view()(request)
+    assert response.status_code == 200
+    assert b'Ready' in response.content
+    assert b'(1 writes)' in response.content
@@ -0,0 +1,58 @@
+"""Compiled user templates (url_template, text_template)."""
+from unittest import mock
+
+import pytest
+from django.template import TemplateSyntaxError
+
+from netbox_qrcode import template_content_functions
+from netbox_qrcode.template_content_functions import create_text, get_template
+
+
+class Obj:
+    name = 'device-1'
+    serial = 'SN1'
+
+
+def test_template_compiled_once():
+    source = '{{ obj.name }}-{{ obj.serial }}'
+    template = get_template(source)
+    assert get_template(source) is template
+    assert template.render({'obj': Obj()}) == 'device-1-SN1'
+
+
+def test_invalid_template_parsed_once():
+    source = '{% if obj.name %}unclosed'
+    engine = template_content_functions.engines['django']
+    with mock.patch.object(template_content_functions, 'engines', {'django': mock.Mock(wraps=engine)}) as engines:
+        with pytest.raises(TemplateSyntaxError):
+            get_template(source)
+        with pytest.raises(TemplateSyntaxError):
+            get_template(source)
+    assert engines['django'].from_string.call_count == 1
+
+
+def test_text_template():
+    config = {'with_text': True, 'text_template': '<b>{{ obj.name }}</b>{{ qrCode|length }}'}
+    assert create_text(config, Obj(), 'abc') == '<b>device-1</b>3'
+
+
+def test_precompile_reports_invalid_templates_once(caplog):
+    source = '{% if obj.serial %}unclosed'
+    config = {
+        'url_template': 'https://netbox/{{ obj.name }}/precompiled',
+        'device': {'text_template': source},
+        'rack_2': {'url_template': 'https://netbox/racks/{{ obj.name }}/precompiled'},
+    }
+    engine = template_content_functions.engines['django']
+    with mock.patch.object(template_content_functions, 'engines', {'django': mock.Mock(wraps=engine)}) as engines:
+        template_content_functions.precompile_templates(config)
+        errors = [record.getMessage() for record in caplog.records if record.levelname == 'ERROR']
+
+        # Labels with the invalid template don't parse or report it again
+        with pytest.raises(TemplateSyntaxError):
+            create_text({'with_text': True, 'text_template': source}, Obj(), 'abc')
+
+    assert len(errors) == 1
+    assert "'device.text_template'" in errors[0]
+    assert engines['django'].from_string.call_count == 3
+    assert len([record for record in caplog.records if record.levelname == 'ERROR']) == 1
@@ -0,0 +1,63 @@
+"""Text of cable labels, which follows the cable terminations to the devices."""
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from dcim.models import Cable, CableTermination, Device, Interface, PowerFeed, Site
+from netbox_qrcode.configs import get_label_config_resolver
+from netbox_qrcode.query_plan import get_query_plan
+from netbox_qrcode.template_content_functions import get_text_fields
+
+CABLES = 100
+
+
+@pytest.fixture(scope='module')
+def cables():
+    site = Site.objects.create(name='site')
+    interface_type = ContentType.objects.get_for_model(Interface)
+    feed_type = ContentType.objects.get_for_model(PowerFeed)
+    for index in range(CABLES):
+        device = Device.objects.create(name=f'cable-device-{index}', site=site)
+        interface = Interface.objects.create(name='eth0', device=device)
+        feed = PowerFeed.objects.create(name=f'feed-{index}')
+        cable = Cable.objects.create(label=f'cable-{index}')
+        CableTermination.objects.create(cable=cable, cable_end='A', termination_type=interface_type, termination_id=interface.pk, _device=device)
+        CableTermination.objects.create(cable=cable, cable_end='B', termination_type=feed_type, termination_id=feed.pk)
+    yield list(Cable.objects.order_by('pk').values_list('pk', flat=True))
+    Cable.objects.all().delete()
+    Device.objects.all().delete()
+
+
+@pytest.fixture
+def cable_config(settings_config):
+    return get_label_config_resolver(settings_config).resolve('cable')
+
+
+@pytest.mark.benchmark(group='get_text_fields')
+def test_text_fields_prefetched(benchmark, cables, settings_config, cable_config):
+    objects = list(get_query_plan(Cable, settings_config).apply(Cable.objects.filter(pk__in=cables)))
+
+    def texts():
+        return [get_text_fields(cable_config, cable) for cable in objects]
+
+    result = benchmark(texts)
+    assert 'cable-device-0' in result[0]
+
+
+@pytest.mark.benchmark(group='get_text_fields')
+def test_text_fields_queries(benchmark, cables, cable_config):
+    def texts():
+        return [get_text_fields(cable_config, cable) for cable in Cable.objects.filter(pk__in=cables)]
+
+    benchmark(texts)
+
+
+def test_query_plan_of_configuration(settings_config):
+    plan = get_query_plan(Cable, settings_config)
+    assert get_query_plan(Cable, settings_config) is plan
+
+    # Another configuration (even if it reuses the id of a collected one) gets a plan of its own
+    config = dict(settings_config, cable={'text_fields': ['label']}, with_text=True, text_template=None)
+    other = get_query_plan(Cable, config)
+    assert other is not plan
+    assert not other.select_related and not other.prefetch_related
+    assert get_label_config_resolver(config).query_plans['dcim.cable'] is other
@@ -0,0 +1,69 @@
+"""Timing of the label pipeline stages (Server-Timing header and metrics)."""
+from unittest import mock
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from netbox_qrcode import timing
+from netbox_qrcode.timing import StageTimer, add_server_timing, get_timer
+
+
+@pytest.fixture
+def clock():
+    """perf_counter() advancing by one second per call."""
+    with mock.patch.object(timing.time, 'perf_counter', side_effect=range(100)):
+        yield
+
+
+def test_stages_added_up(clock):
+    timer = StageTimer()
+    with timer.stage('page'):
+        for index in range(2):
+            with timer.stage('qr'):
+                pass
+
+    assert timer.as_dict() == {
+        'qr': {'ms': 2000.0, 'count': 2},
+        'page': {'ms': 5000.0, 'count': 1},
+    }
+
+
+def test_stage_timed_on_error(clock):
+    timer = StageTimer()
+    with pytest.raises(ZeroDivisionError):
+        with timer.stage('text'):
+            1 / 0
+    assert timer.as_dict() == {'text': {'ms': 1000.0, 'count': 1}}
+
+
+def test_server_timing(clock):
+    timer = StageTimer()
+    with timer.stage('text'):
+        pass
+    with timer.stage('db'):
+        pass
+
+    # In the order of the pipeline
+    assert timer.server_timing() == 'db;dur=1000.0;desc="Database queries (1x)", text;dur=1000.0;desc="create_text (1x)"'
+    assert str(timer) == 'db=1000.0ms/1, text=1000.0ms/1'
+
+
+def test_timer_per_request():
+    request, other = RequestFactory().get('/'), RequestFactory().get('/')
+    assert get_timer(request) is get_timer(request)
+    assert get_timer(other) is not get_timer(request)
+
+
+@pytest.mark.parametrize('enabled', [False, True])
+def test_add_server_timing(settings_config, monkeypatch, clock, enabled):
+    monkeypatch.setitem(settings_config, 'server_timing', enabled)
+    request = RequestFactory().get('/')
+    with get_timer(request).stage('page'):
+        pass
+
+    response = add_server_timing(HttpResponse(), request)
+    if enabled:
+        assert response['Server-Timing'] == 'page;dur=1000.0;desc="Page render (1x)"'
+    else:
+        assert not response.has_header('Server-Timing')
@@ -0,0 +1,10 @@
+"""Parsing of configuration values."""
+import pytest
+
+from netbox_qrcode.utilities import get_number_and_scale
+
+
+@pytest.mark.benchmark(group='get_number_and_scale')
+@pytest.mark.parametrize('value', [3, 12.5, '64mm', '0.11in', '  2.5 cm '])
+def test_get_number_and_scale(benchmark, value):
+    benchmark(get_number_and_scale, value)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from netbox.plugins import PluginConfig
 from .version import __version__ as version
 
@@ -47,9 +48,12 @@ class QRCodeConfig(PluginConfig):
         
         # QR-Code Image File
         'qr_version': 1,
+        'qr_strict_version': False,
         'qr_error_correction': 0,
         'qr_box_size': 4,
         'qr_border': 0,
+        'qr_format': 'png',
+        'qr_image_mode': 'inline',
         
         ################################## 
         # Label Layout
@@ -79,8 +83,44 @@ class QRCodeConfig(PluginConfig):
         'page_right_margin': '6mm',
         'page_columns': 3,
         'page_rows': 9,
+        # Order in which the labels fill a sheet: 'row', 'column' or 'serpentine'
+        'fill_order': 'row',
         # TODO: Do we need seperate label sizes for multi page printing?
 
+        # Send the print preview to the browser sheet by sheet
+        'preview_streaming': False,
+
+        # Only create the first sheet of the print preview, the browser loads the others on demand
+        'preview_lazy_pages': True,
+
+        # Encode the QR codes of bulk printing in worker processes (0: in the web process)
+        'encode_workers': 0,
+        'encode_chunk_size': 16,
+        # Fewer QR codes are encoded in the web process, e.g. a lazily loaded sheet
+        'encode_threshold': 100,
+
+        # Offer to create the labels of large selections in a background job
+        'print_jobs': False,
+
+        # Report the time spent per stage of the print preview as Server-Timing header
+        'server_timing': False,
+
+        # Resolution of the label printer for the ZPL output, in dots per inch
+        'zpl_dpi': 203,
+
+        # Network label printers which print the labels directly (raw TCP), see the docs
+        'printers': {},
+
+        ################################## 
+        # Caching
+        'cache_qr_size': 1024,
+        'cache_backend': None,
+        'cache_timeout': 86400,
+        'cache_labels': False,
+
+        # Lifetime of the objects selected for printing
+        'selection_timeout': 3600,
+
         # Module-dependent configuration
         'device': {
             'text_fields': ['name', 'serial']
@@ -120,4 +160,22 @@ class QRCodeConfig(PluginConfig):
         'logo': '',
     }
 
+    def ready(self):
+        super().ready()
+
+        plugin_config = settings.PLUGINS_CONFIG.get(self.name, {})
+
+        # Resolve the label configurations and parse user-defined templates once at
+        # startup instead of for every label.
+        from .configs import get_label_config_resolver
+        from .template_content_functions import precompile_templates
+        get_label_config_resolver(plugin_config)
+        precompile_templates(plugin_config)
+
+        # Evict cached labels when the objects shown on them change.
+        if plugin_config.get('cache_labels'):
+            from .printing import get_print_models
+            from .signals import connect_signals
+            connect_signals(model for model, extension_class in get_print_models().values())
+
 config = QRCodeConfig # noqa E305
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+
+class QRCodeSerializer(serializers.Serializer):
+    format = serializers.CharField(read_only=True)
+    data = serializers.CharField(read_only=True, help_text="PNG as Base64 or SVG markup")
+
+
+class LabelSerializer(serializers.Serializer):
+    """The content of the label of an object, see `api.views.Label`."""
+    id = serializers.IntegerField(read_only=True, source='obj.pk')
+    display = serializers.CharField(read_only=True, source='obj')
+    design = serializers.IntegerField(read_only=True)
+    last_updated = serializers.DateTimeField(read_only=True, source='obj.last_updated')
+    etag = serializers.CharField(read_only=True, help_text="Changes whenever the label changes")
+    qr_payload = serializers.CharField(read_only=True, help_text="Content of the QR code")
+    qr_code = QRCodeSerializer(read_only=True, allow_null=True)
+    text = serializers.CharField(read_only=True, allow_null=True, help_text="Text of the label (HTML)")
+    lines = serializers.ListField(child=serializers.CharField(), read_only=True, help_text="Text of the label as plain lines")
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = (
+    path('labels/', views.LabelView.as_view(), name='labels'),
+)
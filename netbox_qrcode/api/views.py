@@ -0,0 +1,232 @@
+import base64
+import hashlib
+import json
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+
+from netbox.api.authentication import IsAuthenticatedOrLoginNotRequired
+from netbox.api.pagination import OptionalLimitOffsetPagination
+
+from ..cache import QRImageCache
+from ..configs import QRPrintConfig, get_label_config_resolver
+from ..pdf import text_lines
+from ..printing import LabelBatch, get_print_models
+from ..query_plan import get_query_plan
+from ..template_content_functions import config_for_modul, create_text, create_url, get_qr_image, model_config_name
+from ..views import get_print_view_classes
+from .serializers import LabelSerializer
+
+# ******************************************************************************************
+# REST API: The labels of many objects for external print servers.
+# ******************************************************************************************
+
+
+@dataclass
+class Label:
+    """The content of the label of an object for the API."""
+    obj: Any
+    design: int
+    etag: str
+    qr_payload: str
+    qr_code: Optional[dict]
+    text: Optional[str]
+    lines: list
+
+
+class ZipStream:
+    """Write-only file which collects the output of a `ZipFile`, so the archive can be streamed."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        """Return and forget everything written so far."""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class LabelView(APIView):
+    """
+    The labels of a selection of objects, e.g. for external print servers.
+
+    Query parameters:
+        model: Model of the objects, e.g. `device` (see `get_print_models`).
+        design: Label design number, defaults to 1.
+        output: `json` (default) Paginated label contents including the QR code,
+            `png`/`svg` ZIP archive with the QR code image of each label and a `labels.json`
+            manifest, `pdf` Print sheets (page and label size as in the print preview), `zpl`
+            Labels for label printers (label size as in the print preview).
+        limit, offset: Page of the `json` output.
+        Print settings of the preview (e.g. `label_width`, `page_rows`, `blank_spaces`) apply to
+        the `pdf` and `zpl` output.
+        Everything else filters the objects with the filterset of the model, e.g. `id=1&id=2`,
+        `site_id=3` or `last_updated__gte=2025-01-01T00:00:00Z`.
+
+    Responses have an ETag, which changes whenever an object of the selection is added,
+    removed or changed. Requests with a matching `If-None-Match` header get "304 Not Modified".
+    """
+    permission_classes = [IsAuthenticatedOrLoginNotRequired]
+    pagination_class = OptionalLimitOffsetPagination
+    OUTPUTS = ('json', 'png', 'svg', 'pdf', 'zpl')
+    # Query parameters which are not filters, e.g. `model` is also a filter of devices (the device type model)
+    CONTROL_PARAMS = ('model', 'design', 'output', 'format', 'limit', 'offset')
+    PRINT_PARAMS = tuple(QRPrintConfig.field_types) + ('blank_spaces', 'start_position', 'fill_order')
+
+    def get_view_name(self):
+        return "QR Code Labels"
+
+    def get(self, request):
+        model_name = request.GET.get('model')
+        if model_name not in get_print_models():
+            raise ValidationError({'model': f"Must be one of: {', '.join(get_print_models())}"})
+        output = request.GET.get('output', 'json')
+        if output not in self.OUTPUTS:
+            raise ValidationError({'output': f"Must be one of: {', '.join(self.OUTPUTS)}"})
+        try:
+            design = int(request.GET.get('design', 1))
+        except ValueError:
+            raise ValidationError({'design': "Must be a number."})
+
+        model, filterset_class, filterset_form, table = get_print_view_classes(model_name)
+        filters = request.GET.copy()
+        for param in self.CONTROL_PARAMS + self.PRINT_PARAMS:
+            filters.pop(param, None)
+        filterset = filterset_class(filters, model.objects.restrict(request.user, 'view'), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        queryset = filterset.qs.order_by('pk')
+
+        plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+        etag = self.get_etag(request, model_name, design, queryset, plugin_config)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            if output == 'json':
+                response = self.render_json(request, queryset, model_name, design, plugin_config)
+            elif output == 'pdf':
+                response = self.render_pdf(request, queryset, model_name, design, plugin_config)
+            elif output == 'zpl':
+                response = self.render_zpl(request, queryset, model_name, design, plugin_config)
+            else:
+                response = self.render_zip(request, queryset, model_name, design, output, plugin_config)
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def get_etag(request, model_name, design, queryset, plugin_config):
+        """
+        Return the ETag of the labels of the selected objects: A hash of the request, the
+        configuration of the label design and the primary key and `last_updated` time of each
+        object.
+        """
+        extension_class = get_print_models()[model_name][1]
+        resolver = get_label_config_resolver(plugin_config)
+        state = hashlib.sha256(json.dumps([
+            request.build_absolute_uri('/'),
+            sorted(request.GET.lists()),
+            resolver.resolve(model_config_name(extension_class), design).digest,
+        ]).encode('utf-8'))
+        for pk, last_updated in queryset.values_list('pk', 'last_updated').iterator():
+            state.update(f'{pk}:{last_updated.isoformat() if last_updated else ""};'.encode('utf-8'))
+        return f'"{state.hexdigest()[:32]}"'
+
+    @staticmethod
+    def get_label(request, obj, design, extension_class, plugin_config, qr_format=None, qr_images=None):
+        """
+        Return the content of the label of an object.
+
+        Args:
+            qr_format (str, optional): Format of the QR code image (`png` or `svg`), defaults to the
+                format of the label configuration. `None` in the result if the design has no QR code.
+            qr_images (dict, optional): QR code images encoded in advance, see `LabelBatch.qr_images`.
+        """
+        extension = extension_class(context={'object': obj, 'config': plugin_config, 'request': request})
+        config = config_for_modul(extension, design)
+        url = create_url(extension, config, obj)
+
+        qr_code = None
+        if config.get('with_qr'):
+            qr_format = qr_format or config.qr_format
+            image = get_qr_image(url, config.qr_args, qr_format, qr_images)
+            qr_code = {'format': qr_format, 'data': image}
+
+        text = create_text(config, obj, qr_code['data'] if qr_code else '')
+        etag = QRImageCache.make_key(url, dict(config.qr_args, format=qr_format or config.qr_format, text=text or ''))[:20]
+        return Label(obj, design, etag, url, qr_code, text, text_lines(text) if text else [])
+
+    def render_json(self, request, queryset, model_name, design, plugin_config):
+        """Return a page of the label contents."""
+        model, extension_class = get_print_models()[model_name]
+        paginator = self.pagination_class()
+        objects = paginator.paginate_queryset(get_query_plan(model, plugin_config).apply(queryset), request, view=self)
+        labels = [self.get_label(request, obj, design, extension_class, plugin_config) for obj in objects]
+        return paginator.get_paginated_response(LabelSerializer(labels, many=True).data)
+
+    def render_zip(self, request, queryset, model_name, design, output, plugin_config):
+        """Return a ZIP archive with the QR code image of each label, streamed while the images are created."""
+        pk_list = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+        batch = LabelBatch(model_name, pk_list, {}, request, plugin_config, design=design)
+
+        def content():
+            stream = ZipStream()
+            manifest = []
+            with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for index, obj in batch.iter_objects(qr_format=output):
+                    label = self.get_label(request, obj, design, batch.extension_class, plugin_config, output,
+                                           batch.qr_images)
+                    entry = dict(LabelSerializer(label).data, qr_code=None)
+                    if label.qr_code is not None:
+                        entry['file'] = f'{model_name}_{obj.pk}.{output}'
+                        if output == 'svg':
+                            archive.writestr(entry['file'], label.qr_code['data'].encode('utf-8'))
+                        else:
+                            archive.writestr(entry['file'], base64.b64decode(label.qr_code['data']))
+                    manifest.append(entry)
+                    yield stream.pop()
+                archive.writestr('labels.json', json.dumps(manifest, indent=2, default=str))
+            yield stream.pop()
+
+        response = StreamingHttpResponse(content(), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="qrcodes_{model_name}.zip"'
+        return response
+
+    def render_pdf(self, request, queryset, model_name, design, plugin_config):
+        """Return the labels on print sheets as PDF document, streamed page by page."""
+        pk_list = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+        try:
+            batch = LabelBatch(model_name, pk_list, request.GET, request, plugin_config, design=design)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        message = batch.layout_error()
+        if message:
+            raise ValidationError(message)
+
+        response = StreamingHttpResponse(batch.render_pdf(), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="qrcodes_{model_name}.pdf"'
+        return response
+
+    def render_zpl(self, request, queryset, model_name, design, plugin_config):
+        """Return the labels as ZPL for label printers, streamed label by label."""
+        pk_list = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+        try:
+            batch = LabelBatch(model_name, pk_list, request.GET, request, plugin_config, design=design)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        response = StreamingHttpResponse(batch.render_zpl(), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="qrcodes_{model_name}.zpl"'
+        return response
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+# ******************************************************************************************
+# Caching of generated label artifacts (QR code images etc.).
+# ******************************************************************************************
+
+
+class LRUCache:
+    """
+    A small thread-safe, in-process cache with least-recently-used eviction.
+
+    Args:
+        maxsize (int): Maximum number of entries kept. A value of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for `key` and mark it as recently used."""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        """Store `value` under `key`, evicting the least recently used entries if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class QRImageCache:
+    """
+    Content-addressed, two-tier cache for encoded QR code images.
+
+    Entries are keyed on a hash of the QR payload and all QR code parameters, so the
+    same URL encoded with the same settings is only ever rendered once. The first tier
+    is an in-process LRU cache, the optional second tier is a configured Django cache
+    backend shared between all NetBox processes.
+
+    Args:
+        maxsize (int): Size of the in-process LRU tier.
+        backend (str | None): Alias of the Django cache used as shared tier, or None.
+        timeout (int | None): Lifetime in seconds of entries in the shared tier.
+
+    Attributes:
+        hits (int): Lookups answered by the in-process tier.
+        shared_hits (int): Lookups answered by the shared tier.
+        misses (int): Lookups which required encoding a new image.
+    """
+    key_prefix = 'netbox_qrcode:qr:'
+
+    def __init__(self, maxsize: int = 1024, backend: str | None = None, timeout: int | None = None):
+        self.local = LRUCache(maxsize)
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """The Django cache used as shared tier, or None if not configured."""
+        if self.backend:
+            return caches[self.backend]
+        return None
+
+    @staticmethod
+    def make_key(payload: str, qr_args: dict) -> str:
+        """Return a stable hash for the payload and QR code parameters."""
+        blob = json.dumps([payload, sorted(qr_args.items())], default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def get_or_create(self, payload: str, qr_args: dict, factory):
+        """
+        Return the cached image for the payload and parameters, calling `factory()`
+        to create (and cache) it on a miss.
+        """
+        key = self.make_key(payload, qr_args)
+
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+
+        shared = self.shared
+        if shared is not None:
+            value = shared.get(self.key_prefix + key)
+            if value is not None:
+                self._count('shared_hits')
+                self.local.set(key, value)
+                return value
+
+        self._count('misses')
+        value = factory()
+        self.local.set(key, value)
+        if shared is not None:
+            shared.set(self.key_prefix + key, value, self.timeout)
+        return value
+
+    def get(self, key: str):
+        """Return the cached image of a key (see `make_key`) from either tier, or None."""
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+
+        shared = self.shared
+        if shared is not None:
+            value = shared.get(self.key_prefix + key)
+            if value is not None:
+                self._count('shared_hits')
+                self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value):
+        """Store an image created elsewhere (e.g. in a worker process) under its key (see `make_key`)."""
+        self.local.set(key, value)
+        shared = self.shared
+        if shared is not None:
+            shared.set(self.key_prefix + key, value, self.timeout)
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters and the current size of the in-process tier."""
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'size': len(self.local),
+            'maxsize': self.local.maxsize,
+        }
+
+    def clear(self):
+        """Empty the in-process tier and reset the counters."""
+        self.local.clear()
+        with self._lock:
+            self.hits = self.shared_hits = self.misses = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+_qr_cache = None
+
+
+def get_qr_cache() -> QRImageCache:
+    """
+    Return the process wide QR image cache, created from the plugin configuration
+    (`cache_qr_size`, `cache_backend`, `cache_timeout`) on first use.
+    """
+    global _qr_cache
+    if _qr_cache is None:
+        plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+        _qr_cache = QRImageCache(
+            maxsize=plugin_config.get('cache_qr_size', 1024),
+            backend=plugin_config.get('cache_backend'),
+            timeout=plugin_config.get('cache_timeout'),
+        )
+    return _qr_cache
+
+
+# ******************************************************************************************
+# Fragment cache of rendered labels.
+# ******************************************************************************************
+
+LABEL_KEY_PREFIX = 'netbox_qrcode:label:'
+
+
+def get_label_cache():
+    """
+    Return the Django cache for rendered labels (`cache_backend`, or the default cache),
+    or None if label caching (`cache_labels`) is disabled.
+    """
+    plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+    if not plugin_config.get('cache_labels'):
+        return None
+    return caches[plugin_config.get('cache_backend') or DEFAULT_CACHE_ALIAS]
+
+
+def get_label_cache_timeout():
+    plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+    return plugin_config.get('cache_timeout')
+
+
+def make_label_key(obj, *parts) -> str:
+    """
+    Return the cache key of a rendered label of `obj`. The key changes with the object's
+    `last_updated` timestamp and with any of `parts` (label version, label design,
+    configuration hash, template, dimensions, host), so outdated labels are never looked up
+    again.
+    """
+    blob = json.dumps([obj._meta.label_lower, obj.pk, getattr(obj, 'last_updated', None), parts], default=str)
+    return LABEL_KEY_PREFIX + hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def _label_version_key(model_label, pk):
+    return f'{LABEL_KEY_PREFIX}version:{model_label}:{pk}'
+
+
+def get_label_version(cache, obj, timeout):
+    """
+    Return the version of the cached labels of `obj`, to be included in their keys (see
+    `make_label_key`). Evicting the labels (see `evict_labels`) drops the version, the labels
+    are then stored under a new random one and the old ones expire unused.
+
+    The version is only ever added, never updated, so concurrent requests agree on it
+    without a lock.
+    """
+    version_key = _label_version_key(obj._meta.label_lower, obj.pk)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, timeout):
+            version = cache.get(version_key, version) # Added by another request meanwhile
+    return version
+
+
+def evict_labels(model_label, pks):
+    """Invalidate all cached labels of the given objects, e.g. evict_labels('dcim.device', [1, 2])."""
+    cache = get_label_cache()
+    if cache is None or not pks:
+        return
+    cache.delete_many([_label_version_key(model_label, pk) for pk in pks])
@@ -1,5 +1,19 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+
 from .utilities import to_int, to_float
 
+# Configuration entries starting with "qr_" which are options of the plugin rather than
+# parameters of the QR code itself.
+QR_OPTIONS = ('qr_format', 'qr_image_mode')
+
+# Highest label design number (objectName_2 to ..._10) supported per object.
+MAX_LABEL_DESIGNS = 10
+
 
 class QRPrintConfigValue:
     """
@@ -97,4 +111,124 @@ class QRPrintConfig:
         return scales
 
     def as_dict(self):
-        return {name: getattr(self, name).value for name in self.field_types}
\ No newline at end of file
+        return {name: getattr(self, name).value for name in self.field_types}
+
+
+@dataclass(frozen=True, eq=False)
+class LabelConfig(Mapping):
+    """
+    Immutable, fully resolved label configuration for one model and label design.
+
+    The instance behaves like a read-only dict of all configuration entries, with the
+    module-dependent entries (e.g. `device_2`) already merged over the plugin defaults.
+    The QR code parameters are split off once, so that they don't have to be collected
+    again for every label.
+
+    Attributes:
+    - options (Mapping): All configuration entries.
+    - qr_args (Mapping): Keyword arguments for the QR code, i.e. all `qr_*` entries without
+        the prefix and without the plugin options listed in `QR_OPTIONS`.
+    - qr_format (str): Output format of the QR code (`png` or `svg`).
+    """
+    options: Mapping
+    qr_args: Mapping
+    qr_format: str = 'png'
+
+    @classmethod
+    def from_dict(cls, options: dict) -> "LabelConfig":
+        """Create a LabelConfig from a (merged) configuration dict."""
+        qr_args = {
+            name[len('qr_'):]: value for name, value in options.items()
+            if name.startswith('qr_') and name not in QR_OPTIONS
+        }
+        return cls(
+            options=MappingProxyType(dict(options)),
+            qr_args=MappingProxyType(qr_args),
+            qr_format=options.get('qr_format') or 'png',
+        )
+
+    @cached_property
+    def digest(self) -> str:
+        """
+        A stable hash of all configuration entries, e.g. for cache keys. The sections of the
+        plugin configuration (other label designs, printers) don't affect the label and are
+        left out.
+        """
+        blob = json.dumps(sorted(item for item in self.options.items() if not isinstance(item[1], dict)), default=str)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def __getitem__(self, key):
+        return self.options[key]
+
+    def __iter__(self):
+        return iter(self.options)
+
+    def __len__(self):
+        return len(self.options)
+
+
+class LabelConfigResolver:
+    """
+    Resolves the label configuration of every (model, label design) pair of a plugin
+    configuration once, so that it can be looked up per label in O(1).
+
+    Module-dependent sections are named after the model (`device`) for the first label
+    design and get a suffix for further designs (`device_2` ... `device_10`). Designs are
+    only offered in an unbroken sequence, i.e. `device_5` is ignored if `device_4` is missing.
+
+    Args:
+        config (dict): The plugin configuration (`PLUGINS_CONFIG['netbox_qrcode']`).
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.default = LabelConfig.from_dict(config)
+        self._resolved = {}
+        self._designs = {}
+        # Query plans of the models, replaced together with the resolver (see `get_query_plan`)
+        self.query_plans = {}
+
+        for name, section in config.items():
+            if not isinstance(section, dict):
+                continue
+            model, design = self.split_section_name(name)
+            self._resolved[(model, design)] = LabelConfig.from_dict({**config, **section})
+
+        for model in {model for model, design in self._resolved}:
+            designs = [1]
+            for design in range(2, MAX_LABEL_DESIGNS + 1):
+                if not config.get(f'{model}_{design}'):
+                    break
+                designs.append(design)
+            self._designs[model] = tuple(designs)
+
+    @staticmethod
+    def split_section_name(name: str) -> tuple[str, int]:
+        """Split a section name such as `device_2` into model name and design number."""
+        model, _, suffix = name.rpartition('_')
+        if model and suffix.isdigit() and int(suffix) >= 2:
+            return model, int(suffix)
+        return name, 1
+
+    def resolve(self, model: str, design: int = 1) -> LabelConfig:
+        """Return the label configuration for a model (e.g. `device`) and label design."""
+        return self._resolved.get((model, design), self.default)
+
+    def designs(self, model: str) -> tuple[int, ...]:
+        """Return the label design numbers configured for a model."""
+        return self._designs.get(model, (1,))
+
+
+_resolver = None
+
+
+def get_label_config_resolver(config: dict) -> LabelConfigResolver:
+    """
+    Return the resolver for a plugin configuration. The resolver is only rebuilt if a
+    different configuration object is passed.
+    """
+    global _resolver
+    resolver = _resolver
+    if resolver is None or resolver.config is not config:
+        resolver = _resolver = LabelConfigResolver(config)
+    return resolver
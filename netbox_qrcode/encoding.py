@@ -0,0 +1,110 @@
+import os
+
+from .cache import get_qr_cache
+from .utilities import get_img_b64, get_qr, get_qr_bitmap, get_qr_svg
+
+# ******************************************************************************************
+# Encoding of QR code images, optionally spread over a pool of worker processes. The pool is
+# started once per NetBox process on first use and kept for all further batches.
+# ******************************************************************************************
+
+# The worker processes of this process: (number of workers, executor), see `get_executor`.
+_executor = None
+
+
+def encode_qr(payload, qr_args, qr_format):
+    """
+    Encode a QR code image.
+
+    Args:
+        payload (str): Content of the QR code.
+        qr_args (Mapping): Parameters of the QR code (version, error_correction etc.).
+        qr_format (str): `png` (Base64 encoded), `svg` (markup) or `pdf` (see `get_qr_bitmap`).
+    """
+    if qr_format == 'svg':
+        return get_qr_svg(payload, **qr_args)
+    if qr_format == 'pdf':
+        return get_qr_bitmap(payload, **qr_args)
+    return get_img_b64(get_qr(payload, **qr_args))
+
+
+def _encode(item):
+    return encode_qr(*item)
+
+
+def get_executor(workers):
+    """
+    Return the pool of `workers` worker processes of this process, started on first use. The
+    pool is replaced if the number of workers changes.
+    """
+    global _executor
+    if _executor is None or _executor[0] != workers:
+        from concurrent.futures import ProcessPoolExecutor # Loads multiprocessing
+
+        if _executor is not None:
+            _executor[1].shutdown(wait=False)
+        _executor = (workers, ProcessPoolExecutor(max_workers=workers))
+    return _executor[1]
+
+
+def _reset_executor():
+    # A forked process (e.g. a web or background worker) starts a pool of its own, the
+    # processes of the parent's pool can't be used from the child.
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+class QREncoderPool:
+    """
+    Encodes batches of QR codes in the worker processes of this process (see `get_executor`).
+    The images are returned to the caller and also stored in the QR image cache.
+
+    Payloads which are already cached (in either tier) or occur several times in a batch are
+    only encoded once. Batches with fewer than `threshold` QR codes left to encode are encoded
+    in this process, as handing them to the workers would take longer.
+
+    Args:
+        workers (int): Number of worker processes.
+        chunk_size (int): Number of QR codes handed to a worker at once.
+        threshold (int): Minimum number of QR codes encoded by the worker processes.
+    """
+
+    def __init__(self, workers: int, chunk_size: int = 16, threshold: int = 100):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.threshold = max(threshold, 2)
+
+    def encode(self, items):
+        """
+        Encode the QR codes of a batch.
+
+        Args:
+            items (iterable): (payload, qr_args, qr_format) of each QR code.
+
+        Returns:
+            dict: Key (see `QRImageCache.make_key`) -> image, for each QR code of the batch.
+        """
+        cache = get_qr_cache()
+        images, pending = {}, {}
+        for payload, qr_args, qr_format in items:
+            key = cache.make_key(payload, dict(qr_args, format=qr_format))
+            if key in images or key in pending:
+                continue
+            image = cache.get(key)
+            if image is None:
+                pending[key] = (payload, dict(qr_args), qr_format)
+            else:
+                images[key] = image
+
+        if len(pending) < self.threshold:
+            encoded = map(_encode, pending.values())
+        else:
+            encoded = get_executor(self.workers).map(_encode, pending.values(), chunksize=self.chunk_size)
+        for key, image in zip(pending, encoded):
+            images[key] = image
+            cache.set(key, image)
+        return images
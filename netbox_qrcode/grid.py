@@ -1,4 +1,45 @@
 import math
+from array import array
+from typing import NamedTuple, Sequence
+
+from .utilities import numpy_installed
+
+# Orders in which the labels fill a sheet:
+#   row: row by row, left to right
+#   column: column by column, top to bottom
+#   serpentine: row by row, every second row right to left
+FILL_ORDERS = ('row', 'column', 'serpentine')
+
+
+class GridLayout(NamedTuple):
+    """
+    Positions of a sequence of labels on the sheets, as arrays with one entry per label
+    (NumPy arrays if NumPy is installed).
+
+    Attributes:
+        x (Sequence[float]): Horizontal coordinate of the left edge of the label on its sheet.
+        y (Sequence[float]): Vertical coordinate of the top edge of the label on its sheet.
+        row (Sequence[int]): 1-based row of the label on its sheet.
+        column (Sequence[int]): 1-based column of the label on its sheet.
+        page (Sequence[int]): 1-based sheet of the label.
+    """
+    x: Sequence[float]
+    y: Sequence[float]
+    row: Sequence[int]
+    column: Sequence[int]
+    page: Sequence[int]
+
+    def __len__(self):
+        return len(self.page)
+
+    def position(self, index):
+        """Return the (row, column) of the label at a 0-based index."""
+        return (int(self.row[index]), int(self.column[index]))
+
+    def coordinates(self, index):
+        """Return the (x, y) coordinates of the label at a 0-based index."""
+        return (float(self.x[index]), float(self.y[index]))
+
 
 class GridMaker:
     """
@@ -190,3 +231,62 @@ class GridPosition(GridMaker):
         col_start = self.grid_width_start + self.column_edge_offset + (self.column_width * (col_index - 1))
         row_start = self.grid_height_start + self.row_element_offset + (self.row_height * (row_index - 1))
         return ((col_start, row_start), (row_index, col_index))
+
+    def layout(self, count, start=1, order='row'):
+        """
+        Calculate the positions of `count` consecutive labels on the sheets at once.
+
+        Args:
+            count (int): Number of labels.
+            start (int, optional): 1-based position of the first label, counted over all sheets.
+                The positions before it stay blank, e.g. for partly used sheets. Defaults to 1.
+            order (str, optional): Fill order of the sheets, see `FILL_ORDERS`. Defaults to 'row'.
+
+        Returns:
+            GridLayout: Coordinates, (row, column) and sheet of each label.
+
+        Raises:
+            ValueError: If the fill order is unknown or the start position is less than 1.
+        """
+        if order not in FILL_ORDERS:
+            raise ValueError(f"Unknown fill order {order!r}, expected one of {', '.join(FILL_ORDERS)}")
+        if start < 1:
+            raise ValueError(f"Start position must be at least 1, got {start}")
+
+        rows, columns = int(self.rows), int(self.columns)
+        if numpy_installed():
+            import numpy
+
+            positions = numpy.arange(start - 1, start - 1 + count, dtype=numpy.int64)
+            page, positions = numpy.divmod(positions, rows * columns)
+            if order == 'column':
+                column, row = numpy.divmod(positions, rows)
+            else:
+                row, column = numpy.divmod(positions, columns)
+                if order == 'serpentine':
+                    column = numpy.where(row % 2, columns - 1 - column, column)
+            row, column, page = (values.astype(numpy.int32) + 1 for values in (row, column, page))
+        else:
+            row, column, page = array('l'), array('l'), array('l')
+            for position in range(start - 1, start - 1 + count):
+                sheet, position = divmod(position, rows * columns)
+                if order == 'column':
+                    col_index, row_index = divmod(position, rows)
+                else:
+                    row_index, col_index = divmod(position, columns)
+                    if order == 'serpentine' and row_index % 2:
+                        col_index = columns - 1 - col_index
+                row.append(row_index + 1)
+                column.append(col_index + 1)
+                page.append(sheet + 1)
+
+        # As the grid of the HTML sheets: the first row and column start at the grid start
+        # (the page margins), the spacing between the elements follows each of them.
+        col_start, row_start = self.grid_width_start, self.grid_height_start
+        if numpy_installed():
+            x = col_start + self.column_width * (column - 1)
+            y = row_start + self.row_height * (row - 1)
+        else:
+            x = array('d', (col_start + self.column_width * (col_index - 1) for col_index in column))
+            y = array('d', (row_start + self.row_height * (row_index - 1) for row_index in row))
+        return GridLayout(x, y, row, column, page)
@@ -0,0 +1,103 @@
+import zipfile
+
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.files.temp import NamedTemporaryFile
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from netbox.jobs import JobRunner
+
+from .printing import SHEETS_PLACEHOLDER, BaseURLRequest, LabelBatch, split_sheets
+from .spooler import get_printer
+
+# ******************************************************************************************
+# Background jobs which create the labels of large selections outside of the web request.
+# ******************************************************************************************
+
+
+class PrintLabelsJob(JobRunner):
+    """
+    Creates the labels of a selection of objects and stores them as downloadable file:
+
+    - pdf: Print sheets as PDF document.
+    - zpl: Labels as ZPL for label printers.
+    - html: Print sheets as standalone HTML document.
+    - zip: ZIP archive with the QR code image of each object.
+
+    With a `printer` (see `printers` in the configuration), the labels are sent to the printer
+    as ZPL instead.
+
+    The progress and the name of the created file (or the printer and the number of bytes
+    sent) are kept in the job data.
+    """
+    OUTPUTS = ('pdf', 'zpl', 'html', 'zip')
+
+    class Meta:
+        name = 'QR code labels'
+
+    @staticmethod
+    def get_progress(job):
+        """Return the progress of a job in percent."""
+        data = job.data or {}
+        if not data.get('total'):
+            return 0
+        return int(100 * data.get('done', 0) / data['total'])
+
+    def update_progress(self, done, total):
+        self.job.data = dict(self.job.data or {}, done=done, total=total)
+        self.job.save(update_fields=['data'])
+
+    def run(self, model_name, pk_list, params, output, base_url, *args, printer=None, **kwargs):
+        request = BaseURLRequest(base_url, self.job.user)
+        batch = LabelBatch(model_name, pk_list, params, request, progress=self.update_progress)
+        self.update_progress(0, len(pk_list))
+
+        if printer:
+            target = get_printer(printer)
+            sent = target.send(batch.render_zpl(target.options['dpi']))
+            self.job.data = dict(self.job.data, printer=printer, sent=sent)
+            self.job.save(update_fields=['data'])
+            return
+
+        filename = f'qrcodes_{model_name}.{output}'
+        with NamedTemporaryFile() as artifact:
+            if output == 'pdf':
+                for chunk in batch.render_pdf():
+                    artifact.write(chunk)
+            elif output == 'zpl':
+                for chunk in batch.render_zpl():
+                    artifact.write(chunk)
+            elif output == 'zip':
+                with zipfile.ZipFile(artifact, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    for obj, name, content in batch.iter_qr_images():
+                        archive.writestr(name, content)
+            else:
+                for chunk in self.render_html(batch):
+                    artifact.write(chunk.encode('utf-8'))
+
+            artifact.seek(0)
+            name = default_storage.save(f'netbox_qrcode/jobs/{self.job.pk}/{filename}', File(artifact))
+
+        self.job.data = dict(self.job.data, artifact=name)
+        self.job.save(update_fields=['data'])
+
+    @staticmethod
+    def render_html(batch):
+        """Yield the print sheets as standalone HTML document, sheet by sheet."""
+        context = batch.get_context()
+        sheets = context.pop('sheets')
+        context['sheets_placeholder'] = mark_safe(SHEETS_PLACEHOLDER)
+        parts = split_sheets(render_to_string('netbox_qrcode/print_document.html', context))
+        if parts is None:
+            del context['sheets_placeholder']
+            context['sheets'] = sheets
+            yield render_to_string('netbox_qrcode/print_document.html', context)
+            return
+        head, tail = parts
+        sheet_template = get_template('netbox_qrcode/inc/preview_sheet.html')
+
+        yield head
+        for sheet in sheets:
+            yield sheet_template.render({'sheet': sheet})
+        yield tail
@@ -1,5 +1,6 @@
 from netbox.plugins import PluginMenu, PluginMenuItem
 
+from .spooler import get_printers
 from .utilities import plugin_inventory_installed
 
 menu_items = [
@@ -45,4 +46,12 @@ if plugin_inventory_installed():
             link='plugins:netbox_qrcode:qrcode_print_asset',
             link_text='Assets',
         )
+    )
+
+if get_printers():
+    menu_items.append(
+        PluginMenuItem(
+            link='plugins:netbox_qrcode:qrcode_printers',
+            link_text='Printers',
+        )
     )
\ No newline at end of file
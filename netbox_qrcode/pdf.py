@@ -0,0 +1,350 @@
+import re
+import zlib
+from html import unescape
+
+from django.utils.html import strip_tags
+
+from .cache import get_qr_cache
+from .encoding import encode_qr
+from .utilities import POINTS_PER_UNIT, to_points
+
+# ******************************************************************************************
+# Server-side PDF output for bulk printing. The labels are placed at exact positions of the
+# print grid, so the result does not depend on the layout engine of a browser.
+# ******************************************************************************************
+
+# Glyph widths of the standard fonts Helvetica/Helvetica-Bold for the printable ASCII
+# characters (32 - 126), in 1/1000 of the font size. Used to align and wrap the text.
+_GLYPH_WIDTHS = {
+    'F1': (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+    'F2': (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ),
+}
+_DEFAULT_GLYPH_WIDTH = 556
+
+# Object numbers reserved for the document structure.
+_CATALOG, _PAGES, _FONT_REGULAR, _FONT_BOLD = 1, 2, 3, 4
+
+
+class PDFWriter:
+    """
+    Minimal PDF writer which emits a document page by page.
+
+    Every method returns the bytes to be sent next, so a document of any size can be
+    streamed with a constant amount of memory. The page tree and the cross-reference
+    table are written at the end, once all pages are known.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.pages = []
+        self.next_number = _FONT_BOLD + 1
+
+    def _object(self, number, body):
+        self.offsets[number] = self.position
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        self.position += len(data)
+        return data
+
+    def _stream(self, number, data):
+        data = zlib.compress(data)
+        body = b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(data) + data + b'\nendstream'
+        return self._object(number, body)
+
+    def _reserve(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def begin(self):
+        """Return the file header and the shared font resources."""
+        data = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.position += len(data)
+        data += self._object(_FONT_REGULAR, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        data += self._object(_FONT_BOLD, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+        return data
+
+    def page(self, width, height, content, images):
+        """
+        Return a complete page.
+
+        Args:
+            width (float): Page width in points.
+            height (float): Page height in points.
+            content (bytes): Content stream of the page.
+            images (list[tuple[int, bytes]]): 1-bit square images as (size, compressed data),
+                referenced in the content stream as /Im0, /Im1, ...
+        """
+        data = b''
+        xobjects = b''
+        for index, (size, image) in enumerate(images):
+            number = self._reserve()
+            body = (b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray '
+                    b'/BitsPerComponent 1 /Decode [1 0] /Length %d /Filter /FlateDecode >>\nstream\n' % (size, size, len(image)))
+            data += self._object(number, body + image + b'\nendstream')
+            xobjects += b'/Im%d %d 0 R ' % (index, number)
+
+        content_number = self._reserve()
+        data += self._stream(content_number, content)
+
+        page_number = self._reserve()
+        self.pages.append(page_number)
+        data += self._object(page_number, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %s %s] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> /XObject << %s>> >> >>'
+        ) % (_PAGES, _num(width), _num(height), content_number, _FONT_REGULAR, _FONT_BOLD, xobjects))
+        return data
+
+    def end(self):
+        """Return the page tree, the catalog, the cross-reference table and the trailer."""
+        kids = b' '.join(b'%d 0 R' % number for number in self.pages)
+        data = self._object(_PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.pages)))
+        data += self._object(_CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % _PAGES)
+
+        xref = self.position
+        count = self.next_number
+        data += b'xref\n0 %d\n0000000000 65535 f \n' % count
+        for number in range(1, count):
+            data += b'%010d 00000 n \n' % self.offsets[number]
+        data += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (count, _CATALOG, xref)
+        return data
+
+
+class PDFLabel:
+    """
+    The content of one label: its resolved configuration, the QR code payload, the text
+    (HTML as created by `create_text`) and optionally the QR code image encoded in advance
+    (see `qr_image`).
+    """
+
+    def __init__(self, config, payload, text, image=None):
+        self.config = config
+        self.payload = payload
+        self.text = text or ''
+        self.image = image
+
+
+class PDFLabelSheet:
+    """
+    Renders labels onto PDF pages at the positions of a `GridPosition`.
+
+    Args:
+        grid (GridPosition): Print grid, in the scale of the print configuration.
+        print_config (QRPrintConfig): Page and label dimensions.
+    """
+
+    def __init__(self, grid, print_config):
+        self.grid = grid
+        scale = next(iter(print_config.scales), None) or 'mm'
+        if scale not in POINTS_PER_UNIT:
+            raise ValueError(f"Cannot create a PDF for the scale {scale!r}")
+        self.unit = POINTS_PER_UNIT[scale]
+
+        self.page_width = print_config.page_width.number * self.unit
+        self.page_height = print_config.page_height.number * self.unit
+        self.left_margin = print_config.page_left_margin.number * self.unit
+        self.top_margin = print_config.page_top_margin.number * self.unit
+        self.label_width = print_config.label_width.number * self.unit
+        self.label_height = print_config.label_height.number * self.unit
+
+    def render(self, labels, layout):
+        """
+        Yield the PDF document in pieces, one page at a time.
+
+        Args:
+            labels (iterable[tuple[int, PDFLabel]]): Labels in print order, each with its index in `layout`.
+            layout (GridLayout): Positions of the labels on the pages, see `GridPosition.layout`.
+        """
+        writer = PDFWriter()
+        yield writer.begin()
+
+        content, images = [], []
+        page = 1
+        for index, label in labels:
+            # Pages without labels (e.g. only blank positions) are left empty
+            while layout.page[index] > page:
+                yield writer.page(self.page_width, self.page_height, b''.join(content), images)
+                content, images = [], []
+                page += 1
+            content.append(self.render_label(label, layout.coordinates(index), images))
+
+        yield writer.page(self.page_width, self.page_height, b''.join(content), images)
+        yield writer.end()
+
+    def render_label(self, label, coordinates, images):
+        """Return the drawing operators of a label at the (x, y) coordinates of the grid."""
+        col_start, row_start = coordinates
+        x = self.left_margin + col_start * self.unit
+        y = self.top_margin + row_start * self.unit
+        config = label.config
+
+        qr_box, text_box = label_boxes(config, self.label_width, self.label_height)
+
+        ops = []
+        if qr_box:
+            images.append(label.image or qr_image(label.payload, config.qr_args))
+            bx, by, bw, bh = qr_box
+            ops.append(b'q %s 0 0 %s %s %s cm /Im%d Do Q\n' % (
+                _num(bw), _num(bh), _num(x + bx), _num(self.page_height - (y + by + bh)), len(images) - 1))
+        if text_box:
+            ops.append(self.render_text(label.text, config, x, y, text_box))
+        return b''.join(ops)
+
+    def render_text(self, html, config, x, y, box):
+        """Return the operators for the label text, wrapped, aligned and clipped to its box."""
+        bx, by, bw, bh = box
+        size = to_points(config.get('font_size') or '3mm')
+        leading = size * 1.2
+        font = 'F2' if _is_bold(config) else 'F1'
+
+        lines = []
+        for paragraph in text_lines(html):
+            lines += _wrap(paragraph, font, size, bw)
+        if not lines:
+            return b''
+
+        align_vertical = config.get('text_align_vertical')
+        total = leading * len(lines)
+        if align_vertical == 'top':
+            top = by
+        elif align_vertical == 'bottom':
+            top = by + bh - total
+        else:
+            top = by + (bh - total) / 2
+
+        align_horizontal = config.get('text_align_horizontal')
+        left = x + bx
+        bottom = self.page_height - (y + by + bh)
+        ops = [b'q %s %s %s %s re W n BT /%s %s Tf\n' % (
+            _num(left), _num(bottom), _num(bw), _num(bh), font.encode(), _num(size))]
+        for number, line in enumerate(lines):
+            line_width = _text_width(line, font, size)
+            if align_horizontal == 'center':
+                line_x = left + (bw - line_width) / 2
+            elif align_horizontal == 'right':
+                line_x = left + bw - line_width
+            else:
+                line_x = left
+            baseline = self.page_height - (y + top + number * leading + size * 0.95)
+            ops.append(b'1 0 0 1 %s %s Tm (%s) Tj\n' % (_num(line_x), _num(baseline), _escape(line)))
+        ops.append(b'ET Q\n')
+        return b''.join(ops)
+
+
+def label_boxes(config, width, height):
+    """
+    Return the boxes (x, y, width, height) of the QR code and the text within a label, relative
+    to its top left corner and in points. A box is None if the label has no QR code or text.
+
+    Args:
+        config (LabelConfig): Configuration of the label.
+        width (float): Label width in points.
+        height (float): Label height in points.
+    """
+    edge_top = to_points(config.get('label_edge_top') or 0)
+    edge_left = to_points(config.get('label_edge_left') or 0)
+    edge_right = to_points(config.get('label_edge_right') or 0)
+    edge_bottom = to_points(config.get('label_edge_bottom') or 0)
+    qr_width = to_points(config.get('label_qr_width') or 0)
+    qr_height = to_points(config.get('label_qr_height') or 0)
+    distance = to_points(config.get('label_qr_text_distance') or 0)
+
+    with_qr = config.get('with_qr')
+    with_text = config.get('with_text')
+    location = config.get('text_location')
+
+    # Boxes relative to the top left corner of the label: (x, y, width, height)
+    qr_box = text_box = None
+    if with_qr and with_text:
+        if location in ('right', 'left'):
+            text_width = width - edge_left - edge_right - qr_width - distance
+            qr_top = edge_top + (height - edge_top - qr_height) / 2
+            if location == 'right':
+                qr_box = (edge_left, qr_top, qr_width, qr_height)
+                text_box = (edge_left + qr_width + distance, edge_top, text_width, height - edge_top)
+            else:
+                text_box = (edge_left, edge_top, text_width, height - edge_top)
+                qr_box = (width - edge_right - qr_width, qr_top, qr_width, qr_height)
+        else:
+            qr_left = edge_left + (width - edge_left - edge_right - qr_width) / 2
+            text_height = height - edge_top - edge_bottom - qr_height - distance
+            if location == 'down':
+                qr_box = (qr_left, edge_top, qr_width, qr_height)
+                text_box = (edge_left, edge_top + qr_height + distance, width - edge_left - edge_right, text_height)
+            else:
+                text_box = (edge_left, edge_top, width - edge_left - edge_right, text_height)
+                qr_box = (qr_left, height - edge_bottom - qr_height, qr_width, qr_height)
+    elif with_text:
+        text_box = (edge_left, edge_top, width - edge_left - edge_right, height - edge_top)
+    elif with_qr:
+        qr_box = ((width - qr_width) / 2, (height - qr_height) / 2, qr_width, qr_height)
+    return qr_box, text_box
+
+
+def qr_image(payload, qr_args):
+    """
+    Return the QR code of a payload as 1-bit image data for a PDF: (size, compressed rows).
+    See `get_qr_bitmap`.
+    """
+    return get_qr_cache().get_or_create(payload, dict(qr_args, format='pdf'), lambda: encode_qr(payload, qr_args, 'pdf'))
+
+
+def text_lines(html):
+    """Convert the HTML text of a label into plain text lines."""
+    text = re.sub(r'<br\s*/?>', '\n', html, flags=re.IGNORECASE)
+    text = unescape(strip_tags(text))
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _is_bold(config):
+    weight = str(config.get('font_weight') or '').lower()
+    font = str(config.get('font') or '').lower()
+    return weight in ('bold', 'bolder') or (weight.isdigit() and int(weight) >= 600) or 'bold' in font
+
+
+def _text_width(text, font, size):
+    widths = _GLYPH_WIDTHS[font]
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += widths[code - 32] if 32 <= code <= 126 else _DEFAULT_GLYPH_WIDTH
+    return total * size / 1000
+
+
+def _wrap(text, font, size, width):
+    """Break a line of text at spaces so that it fits into the given width."""
+    lines = []
+    current = ''
+    for word in text.split(' '):
+        candidate = f'{current} {word}' if current else word
+        if current and _text_width(candidate, font, size) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    lines.append(current)
+    return lines
+
+
+def _escape(text):
+    data = text.encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _num(value):
+    number = (b'%.3f' % value).rstrip(b'0').rstrip(b'.')
+    return number if number not in (b'', b'-', b'-0') else b'0'
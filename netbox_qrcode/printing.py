@@ -0,0 +1,390 @@
+import base64
+import math
+from urllib.parse import urljoin
+
+from django.conf import settings
+
+from dcim.models import (
+    Cable,
+    Device,
+    Location,
+    Module,
+    PowerFeed,
+    PowerPanel,
+    Rack,
+)
+
+from .cache import QRImageCache
+from .configs import QRPrintConfig
+from .encoding import QREncoderPool
+from .grid import FILL_ORDERS, GridPosition
+from .pdf import PDFLabel, PDFLabelSheet
+from .query_plan import get_query_plan
+from .template_content import (
+    QRCode,
+    DeviceQRCode,
+    RackQRCode,
+    CableQRCode,
+    LocationQRCode,
+    PowerFeedQRCode,
+    PowerPanelQRCode,
+    ModuleQRCode,
+)
+from .template_content_functions import config_for_modul, create_QRCode, create_text, create_url
+from .timing import get_timer
+from .utilities import plugin_inventory_installed
+from .zpl import ZPLRenderer
+
+# ******************************************************************************************
+# Bulk printing: creates the labels of many objects and lays them out on print sheets.
+# Used by the print preview as well as by background print jobs.
+# ******************************************************************************************
+
+# Marks the place of the sheets in a streamed page.
+SHEETS_PLACEHOLDER = '<!-- netbox_qrcode:sheets -->'
+
+
+def split_sheets(page):
+    """
+    Split a page rendered with the sheets placeholder into the parts before and after the sheets.
+
+    Returns:
+        tuple[str, str] | None: None if the template (e.g. an override) doesn't contain the
+        placeholder exactly once, the page must then be rendered with the sheets.
+    """
+    if page.count(SHEETS_PLACEHOLDER) != 1:
+        return None
+    head, tail = page.split(SHEETS_PLACEHOLDER)
+    return head, tail
+
+
+def get_print_models():
+    """
+    Return the models which can be printed in bulk.
+
+    Returns:
+        dict[str, tuple[Model, type]]: Model name -> (model, template extension class)
+    """
+    print_models = {
+        'device': (Device, DeviceQRCode),
+        'rack': (Rack, RackQRCode),
+        'cable': (Cable, CableQRCode),
+        'location': (Location, LocationQRCode),
+        'powerfeed': (PowerFeed, PowerFeedQRCode),
+        'powerpanel': (PowerPanel, PowerPanelQRCode),
+        'module': (Module, ModuleQRCode),
+    }
+
+    if plugin_inventory_installed():
+        from netbox_inventory.models import Asset
+        from .template_content import Plugin_NetboxInventory_AssetQRCode
+
+        print_models['asset'] = (Asset, Plugin_NetboxInventory_AssetQRCode)
+
+    return print_models
+
+
+class BaseURLRequest:
+    """
+    Stands in for the HTTP request when labels are created outside of one (e.g. in a
+    background job). Absolute URLs for the QR codes are built from `base_url`.
+
+    Args:
+        base_url (str): Absolute URL of the NetBox instance, e.g. "https://netbox.example.com/".
+        user: The user the labels are created for.
+    """
+
+    def __init__(self, base_url, user=None):
+        self.base_url = base_url
+        self.user = user
+
+    def build_absolute_uri(self, location=None):
+        return urljoin(self.base_url, location or '')
+
+
+class LabelBatch:
+    """
+    The labels for a selection of objects, laid out on print sheets.
+
+    Args:
+        model_name (str): Model name of the objects, see `get_print_models`.
+        pk_list (list[str]): Primary keys of the objects in print order.
+        params (dict): Print settings which override the plugin configuration
+            (e.g. `page_rows`, `label_width`, `fill_order`). The first label is placed after
+            `blank_spaces` blank positions, or at the 1-based `start_position`.
+        request: The current request (or a `BaseURLRequest`).
+        plugin_config (dict, optional): Plugin configuration. Defaults to the NetBox configuration.
+        progress (callable, optional): Called with (done, total) whenever all labels of a chunk of
+            objects have been created.
+        design (int): Label design number of all labels (`device`, `device_2` etc.), defaults to 1.
+
+    Raises:
+        KeyError: If the model cannot be printed.
+        ValueError: If a print setting is not a valid number, the print settings use mixed
+            scales or an unknown fill order.
+    """
+    # Number of objects loaded from the database at once.
+    chunk_size = 500
+
+    def __init__(self, model_name, pk_list, params, request, plugin_config=None, progress=None, design=1):
+        self.model, self.extension_class = get_print_models()[model_name]
+        self.model_name = model_name
+        self.design = design
+        self.pk_list = pk_list
+        self.request = request
+        self.progress = progress
+        # QR code images of the current chunk of objects encoded in advance (see `iter_objects`)
+        self.qr_images = {}
+        self.plugin_config = plugin_config if plugin_config is not None else settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+        try:
+            self.print_config = QRPrintConfig(self.plugin_config, params)
+        except TypeError as e:
+            raise ValueError(f"Invalid print setting: {e}") from e
+        try:
+            if params.get('blank_spaces') not in (None, ''):
+                self.blank_spaces = max(int(params['blank_spaces']), 0)
+            else:
+                self.blank_spaces = max(int(params.get('start_position') or 1) - 1, 0)
+        except ValueError:
+            raise ValueError("Blank labels and start position must be whole numbers.") from None
+        self.fill_order = params.get('fill_order') or self.plugin_config.get('fill_order', 'row')
+        if self.fill_order not in FILL_ORDERS:
+            raise ValueError(f"Unknown fill order: {self.fill_order}")
+
+        # Check for mixed scales
+        if len(self.print_config.scales) > 1:
+            raise ValueError(f"Mixed scale exception: {self.print_config.scales}")
+
+        print_config = self.print_config
+        self.grid = GridPosition(
+            rows=print_config.page_rows.number,
+            columns=print_config.page_columns.number,
+            elements=len(pk_list),
+            element_height=print_config.label_height.number,
+            element_width=print_config.label_width.number,
+            grid_width=print_config.page_width.number - (print_config.page_left_margin.number + print_config.page_right_margin.number),
+            grid_height=print_config.page_height.number - (print_config.page_top_margin.number + print_config.page_bottom_margin.number)
+        )
+        self.per_page = self.grid.rows * self.grid.columns
+
+        # Position of each label on the sheets, shared by the HTML and PDF output
+        self.layout = self.grid.layout(len(pk_list), start=self.blank_spaces + 1, order=self.fill_order)
+
+    @property
+    def page_count(self):
+        """Number of print sheets, including the blank positions at the start."""
+        return max(1, math.ceil((self.blank_spaces + len(self.pk_list)) / self.per_page))
+
+    @property
+    def scale(self):
+        """The scale (unit) of all print settings, e.g. "mm"."""
+        return next(iter(self.print_config.scales))
+
+    def layout_error(self):
+        """Return a message if the labels don't fit on the page, else None."""
+        # TODO: We shouldn't ever get here as this should be checked when the config is loaded
+        grid = self.grid
+        print_config = self.print_config
+        if (grid.column_element_offset + grid.element_width) * grid.columns > print_config.page_width.number \
+            or (grid.row_element_offset + grid.element_height) * grid.rows > print_config.page_height.number \
+            or grid.column_element_offset < 0 \
+            or grid.row_element_offset < 0:
+
+            message = "Labels don't fit on the page with the current configuration."
+
+            if (grid.element_width * grid.columns)+(print_config.page_left_margin.number + print_config.page_right_margin.number) > print_config.page_width.number:
+                message += f"Too wide ({(grid.element_width * grid.columns)+(print_config.page_left_margin.number + print_config.page_right_margin.number)}{self.scale}) for page width ({print_config.page_width.value})."
+            if (grid.element_height * grid.rows)+(print_config.page_top_margin.number + print_config.page_bottom_margin.number) > print_config.page_height.number:
+                message += f"Too tall ({(grid.element_height * grid.rows)+(print_config.page_top_margin.number + print_config.page_bottom_margin.number)}{self.scale}) for page height ({print_config.page_height.value})."
+
+            return message
+        return None
+
+    def get_extension(self, obj):
+        """Return the template extension which creates the label of an object."""
+        return self.extension_class(context={
+            'object': obj, 'config': self.plugin_config, 'request': self.request, 'qr_images': self.qr_images,
+        })
+
+    def get_qr_image(self, payload, qr_args, qr_format):
+        """Return a QR code image encoded in advance for the current chunk of objects, or None."""
+        if not self.qr_images:
+            return None
+        return self.qr_images.get(QRImageCache.make_key(payload, dict(qr_args, format=qr_format)))
+
+    def page_labels(self, page):
+        """Return the range of the (0-based) indexes of the labels on a sheet (1-based)."""
+        first = (page - 1) * self.per_page - self.blank_spaces
+        return range(len(self.pk_list))[max(first, 0):max(first + self.per_page, 0)]
+
+    def iter_objects(self, qr_format=None, labels=None, encode=True):
+        """
+        Yield (index, object) in the order of the requested primary keys, for all objects of
+        the batch or the given range of label indexes (see `layout`). Objects which no longer
+        exist are left out.
+
+        The objects are loaded in chunks of `chunk_size`, so the memory use does not
+        grow with the number of selected objects. Related objects required for the
+        labels are loaded together with each chunk (see `get_query_plan`).
+
+        With `encode_workers` configured, the QR codes of each chunk are encoded in a pool
+        of worker processes (in this process below `encode_threshold`) before the objects
+        are handed out, in `qr_format` (e.g. `pdf`) or the format of the label configuration,
+        unless the QR codes aren't needed as images (`encode=False`). The images are available in `qr_images` (see `get_qr_image`) while
+        the objects of the chunk are handed out.
+        """
+        plan = get_query_plan(self.model, self.plugin_config)
+        encoder = None
+        if encode and self.plugin_config.get('encode_workers'):
+            encoder = QREncoderPool(
+                self.plugin_config['encode_workers'], self.plugin_config.get('encode_chunk_size', 16),
+                self.plugin_config.get('encode_threshold', 100),
+            )
+
+        if labels is None:
+            labels = range(len(self.pk_list))
+
+        try:
+            for start in range(labels.start, labels.stop, self.chunk_size):
+                chunk = self.pk_list[start:min(start + self.chunk_size, labels.stop)]
+                queryset = plan.apply(self.model.objects.filter(pk__in=chunk))
+                with get_timer(self.request).stage('db'):
+                    objects = {
+                        str(obj.pk): obj
+                        for obj in queryset.iterator(chunk_size=self.chunk_size)
+                    }
+                if encoder is not None:
+                    self.qr_images = encoder.encode(self.iter_qr_codes(objects.values(), qr_format))
+                for index, pk in enumerate(chunk, start=start):
+                    obj = objects.get(str(pk))
+                    if obj is not None:
+                        yield index, obj
+                if self.progress is not None:
+                    self.progress(start + len(chunk) - labels.start, len(labels))
+        finally:
+            self.qr_images = {}
+
+    def iter_qr_codes(self, objects, qr_format=None):
+        """
+        Yield the (payload, qr_args, qr_format) of the QR codes on the labels of the objects, in
+        `qr_format` or the format of the label configuration.
+        """
+        for obj in objects:
+            extension = self.get_extension(obj)
+            config = config_for_modul(extension, self.design)
+            if not config.get('with_qr'):
+                continue
+            if qr_format:
+                yield create_url(extension, config, obj), config.qr_args, qr_format
+            elif config.get('qr_image_mode') != 'url':
+                yield create_url(extension, config, obj), config.qr_args, config.qr_format
+
+    def iter_labels(self, labels=None):
+        """
+        Yield (index, object, label HTML) for each object (of all of the batch, or of the
+        given range of label indexes), one at a time.
+
+        Labels of the same design share a CSS class, whose rules are only included with the
+        first label of the design.
+        """
+        emitted_styles = set()
+        for index, obj in self.iter_objects(labels=labels):
+            # Only QR code and label, no extra card or controls
+            qr_label_html = QRCode.Create_SubPluginContent(
+                self.get_extension(obj),
+                labelDesignNo=self.design,
+                template_name='netbox_qrcode/qrcode3_print.html',
+                label_width=self.print_config.label_width.value,
+                label_height=self.print_config.label_height.value,
+                emitted_styles=emitted_styles,
+            )
+            yield index, obj, qr_label_html
+
+    def iter_pdf_labels(self, qr_images=True):
+        """
+        Yield (index, content) of each object's label, the content being configuration, QR code
+        payload and text. Without `qr_images` the QR codes are not encoded in advance.
+        """
+        timer = get_timer(self.request)
+        for index, obj in self.iter_objects(qr_format='pdf', encode=qr_images):
+            extension = self.get_extension(obj)
+            config = config_for_modul(extension, self.design)
+            with timer.stage('url'):
+                url = create_url(extension, config, obj)
+            with timer.stage('text'):
+                text = create_text(config, obj, '')
+            image = self.get_qr_image(url, config.qr_args, 'pdf') if config.get('with_qr') else None
+            yield index, PDFLabel(config, url, text, image)
+
+    def iter_qr_images(self):
+        """Yield the QR code image of each object as (object, file name, file content)."""
+        for index, obj in self.iter_objects():
+            extension = self.get_extension(obj)
+            config = config_for_modul(extension, self.design)
+            image = create_QRCode(create_url(extension, config, obj), config, self.qr_images)
+            if config.qr_format == 'svg':
+                yield obj, f'{self.model_name}_{obj.pk}.svg', image.encode('utf-8')
+            else:
+                yield obj, f'{self.model_name}_{obj.pk}.png', base64.b64decode(image)
+
+    def iter_sheets(self, page=None):
+        """
+        Yield the print sheets, each a list of (object, label HTML, (row, column)) tuples.
+        Blank positions have no entry, so sheets before the first label are empty.
+
+        Args:
+            page (int, optional): Only yield this sheet (1-based). Only the labels of its
+                objects are created.
+        """
+        pages = range(1, self.page_count + 1) if page is None else range(page, page + 1)
+        labels = range(self.page_labels(pages.start).start, self.page_labels(pages.stop - 1).stop)
+
+        sheet, sheet_page = [], pages.start
+        for index, obj, qr_html in self.iter_labels(labels):
+            while self.layout.page[index] > sheet_page:
+                yield sheet
+                sheet, sheet_page = [], sheet_page + 1
+            sheet.append((obj, qr_html, self.layout.position(index)))
+        for sheet_page in range(sheet_page, pages.stop):
+            yield sheet
+            sheet = []
+
+    def render_pdf(self):
+        """Yield the labels as PDF document, page by page."""
+        return PDFLabelSheet(self.grid, self.print_config).render(self.iter_pdf_labels(), self.layout)
+
+    def render_zpl(self, dpi=None):
+        """
+        Yield the labels as ZPL for label printers, label by label (see `ZPLRenderer`).
+
+        Args:
+            dpi (int, optional): Resolution of the printer, defaults to `zpl_dpi`.
+        """
+        renderer = ZPLRenderer(self.print_config, int(dpi or self.plugin_config.get('zpl_dpi', 203)))
+        return renderer.render(self.iter_pdf_labels(qr_images=False))
+
+    def get_context(self):
+        """Return the template context for the print sheets."""
+        print_config = self.print_config
+        return {
+            'sheets': self.iter_sheets(),
+            'grid': self.grid,
+            'per_page': self.per_page,
+            'page_rows': print_config.page_rows.value,
+            'page_columns': print_config.page_columns.value,
+            'page_width': print_config.page_width.value,
+            'page_height': print_config.page_height.value,
+            'page_top_margin': print_config.page_top_margin.value,
+            'page_bottom_margin': print_config.page_bottom_margin.value,
+            'page_left_margin': print_config.page_left_margin.value,
+            'page_right_margin': print_config.page_right_margin.value,
+            'label_height': print_config.label_height.value,
+            'label_width': print_config.label_width.value,
+            'row_range': range(1, self.grid.rows + 1),
+            'col_range': range(1, self.grid.columns + 1),
+            'scale': self.scale,
+            'model': self.model,  # TODO: what is model?
+            'blank_spaces': self.blank_spaces,
+            'fill_order': self.fill_order,
+            'fill_orders': FILL_ORDERS,
+        }
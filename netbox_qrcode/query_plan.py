@@ -0,0 +1,192 @@
+import re
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+from .configs import get_label_config_resolver
+from .template_content_functions import TEMPLATE_CONFIG_KEYS
+
+# ******************************************************************************************
+# Plans the select_related/prefetch_related calls required to render the labels of many
+# objects with a constant number of queries.
+# ******************************************************************************************
+
+# Label attributes which are properties rather than model fields, mapped to the lookup
+# that loads the data behind them.
+ATTRIBUTE_LOOKUPS = {
+    'dcim.cable': {
+        'a_terminations': 'terminations__termination',
+        'b_terminations': 'terminations__termination',
+    },
+}
+
+# References to the object in user templates, e.g. "{{ obj.site.name }}".
+_template_reference_re = re.compile(r'\bobj((?:\.\w+)+)')
+
+
+class QueryPlan:
+    """
+    The related objects to load together with the objects of a label queryset.
+
+    Attributes:
+        select_related (set[str]): Lookups of single-valued relations, joined into the query.
+        prefetch_related (set[str]): Lookups which traverse multi-valued or generic relations.
+        generic_prefetches (dict): Lookups ending in a generic relation which must be followed
+            further, mapped to the querysets used for the generic relation (see `GenericPrefetch`).
+    """
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.generic_prefetches = {}
+
+    def __bool__(self):
+        return bool(self.select_related or self.prefetch_related or self.generic_prefetches)
+
+    def __repr__(self):
+        return f"<QueryPlan select_related={sorted(self.select_related)} prefetch_related={sorted(self.prefetch_related)}>"
+
+    def apply(self, queryset):
+        """Return the queryset with the planned select_related/prefetch_related calls applied."""
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related or self.generic_prefetches:
+            queryset = queryset.prefetch_related(*self.get_prefetches(queryset.model))
+        return queryset
+
+    def get_prefetches(self, model):
+        """
+        Return the prefetch lookups. Lookups which continue after a generic relation are
+        replaced by a `GenericPrefetch`, because the objects behind a generic relation can be
+        of different types.
+        """
+        prefetches = []
+        lookups = set(self.prefetch_related)
+
+        for generic_lookup, querysets in sorted(self.generic_prefetches.items()):
+            lookups = {
+                lookup for lookup in lookups
+                if lookup != generic_lookup and not lookup.startswith(generic_lookup + '__')
+            }
+            *path, field_name = generic_lookup.split('__')
+            prefetch = GenericPrefetch(field_name, querysets)
+            # Nest the generic prefetch into the prefetch of the relations leading to it.
+            while path:
+                related_model = _related_model(model, path)
+                prefetch = Prefetch(path.pop(), queryset=related_model.objects.prefetch_related(prefetch))
+            prefetches.append(prefetch)
+
+        return prefetches + sorted(lookups)
+
+    def add_path(self, model, parts):
+        """
+        Add the lookups required to resolve an attribute path (e.g. ['site', 'region', 'name'])
+        starting at `model`.
+        """
+        parts = [part for part in parts if not part.isdigit()] # List indices in templates
+        if not parts:
+            return
+
+        hint = ATTRIBUTE_LOOKUPS.get(model._meta.label_lower, {}).get(parts[0])
+        if hint:
+            parts = hint.split('__') + parts[1:]
+
+        lookup = []
+        many = False
+        current = model
+        for index, part in enumerate(parts):
+            try:
+                field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+
+            if isinstance(field, GenericForeignKey):
+                lookup.append(part)
+                many = True
+                if index + 1 < len(parts):
+                    querysets = _generic_querysets(current, field, parts[index + 1])
+                    if querysets:
+                        self.generic_prefetches['__'.join(lookup)] = querysets
+                break
+
+            if not field.is_relation or field.related_model is None:
+                break
+
+            lookup.append(part)
+            many = many or field.many_to_many or field.one_to_many
+            current = field.related_model
+
+        if not lookup:
+            return
+        if many:
+            self.prefetch_related.add('__'.join(lookup))
+        else:
+            self.select_related.add('__'.join(lookup))
+
+
+def _related_model(model, path):
+    """Return the model at the end of a path of relation names."""
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    return model
+
+
+def _generic_querysets(model, field, attribute):
+    """
+    Return querysets for all models a generic relation may point to, each loading the
+    single-valued relation `attribute` together with the object. Only models permitted by
+    the content type field's `limit_choices_to` are considered.
+    """
+    ct_field = model._meta.get_field(field.ct_field)
+    limit_choices_to = ct_field.remote_field.limit_choices_to
+    if not limit_choices_to or callable(limit_choices_to):
+        return []
+
+    querysets = []
+    for content_type in ContentType.objects.filter(limit_choices_to):
+        related_model = content_type.model_class()
+        if related_model is None:
+            continue
+        try:
+            related_field = related_model._meta.get_field(attribute)
+        except FieldDoesNotExist:
+            continue
+        if related_field.many_to_one or related_field.one_to_one:
+            querysets.append(related_model.objects.select_related(attribute))
+    return querysets
+
+
+def template_references(source):
+    """Return the attribute paths of the object referenced in a template, e.g. [['site', 'name']]."""
+    return [match.group(1).lstrip('.').split('.') for match in _template_reference_re.finditer(source or '')]
+
+
+def get_query_plan(model, plugin_config):
+    """
+    Return the query plan for the labels of a model. It covers the `text_fields` and the
+    templates (best effort) of all label designs configured for the model. Plans are
+    created once per model and kept by the resolver of the plugin configuration, so they
+    are replaced together with it (see `get_label_config_resolver`).
+    """
+    resolver = get_label_config_resolver(plugin_config)
+    plan = resolver.query_plans.get(model._meta.label_lower)
+    if plan is not None:
+        return plan
+
+    config_name = model._meta.label_lower.replace('dcim.', '')
+    configs = [resolver.default] + [resolver.resolve(config_name, design) for design in resolver.designs(config_name)]
+
+    plan = QueryPlan()
+    for config in configs:
+        if config.get('with_text') and not config.get('text_template'):
+            for text_field in config.get('text_fields') or []:
+                plan.add_path(model, text_field.split('.'))
+        for template_key in TEMPLATE_CONFIG_KEYS:
+            for parts in template_references(config.get(template_key)):
+                plan.add_path(model, parts)
+
+    resolver.query_plans[model._meta.label_lower] = plan
+    return plan
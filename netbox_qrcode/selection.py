@@ -0,0 +1,59 @@
+import secrets
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+# ******************************************************************************************
+# Server-side store for the objects selected for printing. The print preview is addressed
+# by a short token instead of carrying every selected primary key in its URL.
+# ******************************************************************************************
+
+KEY_PREFIX = 'netbox_qrcode:selection:'
+
+
+def _get_cache():
+    """The selections are kept in the plugin's cache backend, or the default cache."""
+    plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+    return caches[plugin_config.get('cache_backend') or DEFAULT_CACHE_ALIAS]
+
+
+def _get_timeout():
+    plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+    return plugin_config.get('selection_timeout', 3600)
+
+
+def save_selection(user, model_name, pk_list):
+    """
+    Store a selection of objects and return the token under which it can be loaded.
+
+    Args:
+        user: The user who made the selection. Only this user can load it again.
+        model_name (str): Model name of the selected objects, e.g. "device".
+        pk_list (list[str]): Primary keys of the selected objects in print order.
+
+    Returns:
+        str: The token of the selection.
+    """
+    token = secrets.token_urlsafe(12)
+    _get_cache().set(KEY_PREFIX + token, {
+        'user': user.pk,
+        'model': model_name,
+        'pk': list(pk_list),
+    }, _get_timeout())
+    return token
+
+
+def load_selection(user, token):
+    """
+    Load a stored selection. Each access extends the lifetime of the selection.
+
+    Returns:
+        tuple[str, list[str]] | None: (model_name, pk_list), or None if the selection does
+            not exist, has expired or belongs to another user.
+    """
+    cache = _get_cache()
+    selection = cache.get(KEY_PREFIX + token)
+    if selection is None or selection['user'] != user.pk:
+        return None
+    cache.touch(KEY_PREFIX + token, _get_timeout())
+    return selection['model'], selection['pk']
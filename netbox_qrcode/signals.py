@@ -0,0 +1,70 @@
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .cache import evict_labels, get_label_cache
+
+# ******************************************************************************************
+# Evicts cached labels when the objects shown on them change.
+# ******************************************************************************************
+
+
+def evict_object_labels(sender, instance, **kwargs):
+    """An object with labels was changed or deleted."""
+    evict_labels(sender._meta.label_lower, [instance.pk])
+
+
+def evict_device_cable_labels(sender, instance, **kwargs):
+    """A device was changed or deleted: The labels of its cables show the device."""
+    from dcim.models import CableTermination
+
+    if get_label_cache() is None:
+        return
+    cable_ids = CableTermination.objects.filter(_device=instance).values_list('cable_id', flat=True)
+    evict_labels('dcim.cable', set(cable_ids))
+
+
+def evict_termination_cable_labels(sender, instance, **kwargs):
+    """A cable termination or a cabled object (e.g. an interface) was changed or deleted."""
+    cable_id = getattr(instance, 'cable_id', None)
+    if cable_id:
+        evict_labels('dcim.cable', [cable_id])
+
+
+def evict_m2m_labels(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """A many-to-many relation (e.g. tags) of an object with labels was changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        if instance._meta.label_lower in _label_models:
+            evict_labels(instance._meta.label_lower, [instance.pk])
+    elif model._meta.label_lower in _label_models and pk_set:
+        evict_labels(model._meta.label_lower, pk_set)
+
+
+_label_models = set()
+
+
+def connect_signals(models):
+    """
+    Connect the handlers for the models with labels (with `cache_labels` only). Besides
+    changes of the objects themselves, changes of cable terminations, of cabled objects
+    (interfaces, ports etc.) and of devices evict the labels of the cables involved.
+    """
+    from dcim.models import CableTermination, Device
+    from dcim.models.device_components import CabledObjectModel
+
+    for model in models:
+        _label_models.add(model._meta.label_lower)
+        post_save.connect(evict_object_labels, sender=model, dispatch_uid=f'netbox_qrcode_evict_{model._meta.label_lower}')
+        post_delete.connect(evict_object_labels, sender=model, dispatch_uid=f'netbox_qrcode_evict_{model._meta.label_lower}')
+
+    termination_models = [CableTermination] + [
+        model for model in apps.get_models() if issubclass(model, CabledObjectModel)
+    ]
+    for model in termination_models:
+        dispatch_uid = f'netbox_qrcode_evict_cables_{model._meta.label_lower}'
+        post_save.connect(evict_termination_cable_labels, sender=model, dispatch_uid=dispatch_uid)
+        post_delete.connect(evict_termination_cable_labels, sender=model, dispatch_uid=dispatch_uid)
+
+    post_save.connect(evict_device_cable_labels, sender=Device, dispatch_uid='netbox_qrcode_evict_device_cables')
+    m2m_changed.connect(evict_m2m_labels, dispatch_uid='netbox_qrcode_evict_m2m')
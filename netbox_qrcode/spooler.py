@@ -0,0 +1,297 @@
+import logging
+import socket
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# ******************************************************************************************
+# Direct printing to network label printers (raw TCP, usually port 9100). The labels of a print
+# job are sent over one connection in a few large writes. The counters and the state of the
+# printers are kept in the Django cache, so all NetBox processes (including the background
+# workers, which run each job in a process of its own) report the same.
+# ******************************************************************************************
+
+# Options of a printer (see `printers` in the plugin configuration) -> default.
+PRINTER_DEFAULTS = {
+    'port': 9100,
+    # Resolution for the ZPL output, defaults to `zpl_dpi`
+    'dpi': None,
+    # Seconds to connect and to wait for the status of the printer while sending
+    'timeout': 10,
+    # Seconds to connect and to wait for the status of the printer in the status view
+    'status_timeout': 2,
+    # Seconds to wait until the printer accepts more data, e.g. while its buffer is full
+    'write_timeout': 300,
+    # Attempts to resend a batch after a connection error, with a delay which doubles each time
+    'retries': 3,
+    'retry_delay': 1,
+    # Bytes sent at once, always whole labels
+    'batch_size': 65536,
+    # Wait before each batch while the printer has this many labels (formats) waiting in its
+    # receive buffer, queried with ~HS. 0 only relies on the TCP flow control.
+    'max_pending': 0,
+}
+
+# Prefix of the cache keys of the printer state, followed by the printer name and the entry.
+STATE_KEY_PREFIX = 'netbox_qrcode:printer:'
+
+
+class PrinterError(Exception):
+    """The labels could not be sent to a printer."""
+
+
+@dataclass
+class PrinterStatus:
+    """The status of a Zebra printer as reported by the host status command (~HS)."""
+    paper_out: bool
+    paused: bool
+    formats_in_buffer: int
+    buffer_full: bool
+    head_up: bool
+    ribbon_out: bool
+    labels_remaining: int
+
+    @classmethod
+    def parse(cls, data):
+        """
+        Parse the response to ~HS: three lines, each framed by STX and ETX.
+
+        Raises:
+            ValueError: If the response is incomplete.
+        """
+        lines = [line.strip('\x02\x03\r\n ').split(',') for line in data.decode('ascii', 'replace').split('\x03')]
+        if len(lines) < 2 or len(lines[0]) < 6 or len(lines[1]) < 9:
+            raise ValueError(f"Invalid printer status: {data!r}")
+        first, second = lines[0], lines[1]
+        return cls(
+            paper_out=first[1] == '1',
+            paused=first[2] == '1',
+            formats_in_buffer=int(first[4]),
+            buffer_full=first[5] == '1',
+            head_up=second[2] == '1',
+            ribbon_out=second[3] == '1',
+            labels_remaining=int(second[8]),
+        )
+
+    @property
+    def problems(self):
+        """Descriptions of the conditions which stop the printer."""
+        conditions = (
+            (self.paper_out, "Paper out"), (self.paused, "Paused"),
+            (self.head_up, "Head open"), (self.ribbon_out, "Ribbon out"),
+        )
+        return [description for condition, description in conditions if condition]
+
+
+class Printer:
+    """
+    A network label printer. Each `send` opens a connection of its own, which is closed when
+    all labels are sent, so printers which only accept one client at a time are not blocked
+    between print jobs.
+
+    The number of bytes and writes sent, the reconnects, the last error and whether labels
+    are being sent are kept in the Django cache (see `get_state`).
+
+    Args:
+        name (str): Name of the printer in the configuration.
+        host (str): Host name or IP address of the printer.
+        **options: See `PRINTER_DEFAULTS`.
+    """
+
+    def __init__(self, name, host, **options):
+        self.name = name
+        self.host = host
+        self.options = dict(PRINTER_DEFAULTS, **options)
+        self.port = int(self.options['port'])
+
+    @property
+    def cache(self):
+        plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+        return caches[plugin_config.get('cache_backend') or DEFAULT_CACHE_ALIAS]
+
+    def state_key(self, entry):
+        return f'{STATE_KEY_PREFIX}{self.name}:{entry}'
+
+    def connect(self, timeout=None):
+        """Open a connection to the printer."""
+        sock = socket.create_connection((self.host, self.port), timeout=timeout or self.options['timeout'])
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return sock
+
+    def send(self, chunks):
+        """
+        Send data to the printer, e.g. the labels of `LabelBatch.render_zpl`. The chunks are
+        collected into writes of `batch_size` bytes and only taken from the iterable when the
+        printer accepts more data, so the labels are not created faster than they are printed.
+
+        A batch which fails with a connection error is sent again on a new connection, up to
+        `retries` times. The labels of a batch the printer had partly received may therefore be
+        printed twice.
+
+        Returns:
+            int: Number of bytes sent.
+
+        Raises:
+            PrinterError: If the printer cannot be reached or doesn't accept the data in time.
+        """
+        sent = 0
+        sock = None
+        try:
+            for batch in iter_batches(chunks, self.options['batch_size']):
+                self.set_busy()
+                sock = self.send_batch(sock, batch)
+                sent += len(batch)
+        finally:
+            if sock is not None:
+                sock.close()
+            self.cache.delete(self.state_key('busy'))
+        return sent
+
+    def send_batch(self, sock, batch):
+        """
+        Send one batch, see `send`.
+
+        Returns:
+            socket: The connection, to be used for the next batch.
+        """
+        retries = int(self.options['retries'])
+        for attempt in range(retries + 1):
+            try:
+                if sock is None:
+                    sock = self.connect()
+                if self.options['max_pending']:
+                    self.wait_for_buffer(sock)
+                sock.settimeout(self.options['write_timeout'])
+                sock.sendall(batch)
+                sock.settimeout(self.options['timeout'])
+            except OSError as e:
+                if sock is not None:
+                    sock.close()
+                    sock = None
+                self.cache.set(self.state_key('last_error'), (str(e), timezone.now()), None)
+                if attempt == retries:
+                    raise PrinterError(f"Cannot send labels to printer {self.name} ({self.host}:{self.port}): {e}") from e
+                delay = self.options['retry_delay'] * 2 ** attempt
+                logger.warning("Printer %s: %s, retrying in %ss", self.name, e, delay)
+                time.sleep(delay)
+                self.count('reconnects')
+            else:
+                self.count('bytes_sent', len(batch))
+                self.count('writes')
+                return sock
+
+    def set_busy(self):
+        """
+        Mark the printer as busy while labels are sent, so the status view doesn't query it.
+        The mark expires if the process ends without removing it.
+        """
+        key = self.state_key('busy')
+        since = self.cache.get(key) or timezone.now()
+        self.cache.set(key, since, self.options['write_timeout'] + self.options['timeout'])
+
+    def count(self, counter, value=1):
+        """Add to a counter of the printer, shared by all processes."""
+        key = self.state_key(counter)
+        try:
+            self.cache.incr(key, value)
+        except ValueError: # Not counted yet
+            if not self.cache.add(key, value, None):
+                self.cache.incr(key, value)
+
+    def wait_for_buffer(self, sock):
+        """Wait while the receive buffer of the printer is full or has `max_pending` labels."""
+        deadline = time.monotonic() + self.options['write_timeout']
+        while True:
+            status = query_status(sock)
+            if not status.buffer_full and status.formats_in_buffer < self.options['max_pending']:
+                return
+            if time.monotonic() > deadline:
+                raise PrinterError(f"Printer {self.name} did not print the waiting labels in time: "
+                                   f"{', '.join(status.problems) or 'busy'}")
+            time.sleep(self.options['retry_delay'])
+
+    def get_state(self):
+        """Return the counters and the state of the printer, as shared by all processes."""
+        values = self.cache.get_many([
+            self.state_key(entry) for entry in ('busy', 'bytes_sent', 'writes', 'reconnects', 'last_error')
+        ])
+        last_error, last_error_time = values.get(self.state_key('last_error')) or (None, None)
+        return {
+            'name': self.name,
+            'host': self.host,
+            'port': self.port,
+            'busy_since': values.get(self.state_key('busy')),
+            'bytes_sent': values.get(self.state_key('bytes_sent'), 0),
+            'writes': values.get(self.state_key('writes'), 0),
+            'reconnects': values.get(self.state_key('reconnects'), 0),
+            'last_error': last_error,
+            'last_error_time': last_error_time,
+        }
+
+    def get_status(self):
+        """
+        Return the state of the printer (see `get_state`) with the status reported by the
+        printer. The printer is queried over a short-lived connection with `status_timeout`,
+        and only while no labels are sent to it.
+        """
+        state = dict(self.get_state(), busy=False, status=None, error=None)
+        if state['busy_since'] is not None:
+            state['busy'] = True
+            return state
+        try:
+            with self.connect(self.options['status_timeout']) as sock:
+                state['status'] = query_status(sock)
+        except (OSError, ValueError) as e:
+            state['error'] = str(e)
+        return state
+
+
+def query_status(sock):
+    """
+    Return the `PrinterStatus` queried with ~HS over a connection.
+
+    Raises:
+        OSError: If the printer doesn't answer within the timeout of the connection.
+        ValueError: If the answer is not a valid status.
+    """
+    sock.sendall(b'~HS')
+    data = b''
+    while data.count(b'\x03') < 3:
+        chunk = sock.recv(1024)
+        if not chunk:
+            raise ConnectionResetError("Connection closed by the printer")
+        data += chunk
+    return PrinterStatus.parse(data)
+
+
+def iter_batches(chunks, size):
+    """Join chunks of data into batches of at least `size` bytes (except the last one)."""
+    batch, length = [], 0
+    for chunk in chunks:
+        batch.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(batch)
+            batch, length = [], 0
+    if batch:
+        yield b''.join(batch)
+
+
+def get_printers():
+    """Return the configured printers: Name -> options."""
+    return settings.PLUGINS_CONFIG.get('netbox_qrcode', {}).get('printers') or {}
+
+
+def get_printer(name):
+    """
+    Return a configured printer.
+
+    Raises:
+        KeyError: If the printer is not configured.
+    """
+    return Printer(name, **get_printers()[name])
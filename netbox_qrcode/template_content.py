@@ -4,8 +4,12 @@ from django.urls import reverse
 from netbox.plugins import PluginTemplateExtension
 from packaging import version
 
+from .cache import get_label_cache, get_label_cache_timeout, get_label_version, make_label_key
+from .configs import get_label_config_resolver
 from .template_content_functions import (config_for_modul, create_QRCode,
-                                         create_text, create_url)
+                                         create_QRCode_url, create_text, create_url,
+                                         get_label_style, model_config_name)
+from .timing import get_timer
 
 # ******************************************************************************************
 # Contains the main functionalities of the plugin and thus creates the content for the 
@@ -21,7 +25,9 @@ class QRCode(PluginTemplateExtension):
     # --------------------------------
     # Parameter:
     #   labelDesignNo: Which label design should be loaded.
-    def Create_SubPluginContent(self, labelDesignNo, template_name='netbox_qrcode/qrcode3.html', label_width=None, label_height=None):
+    #   emitted_styles: For printed labels: The CSS classes of the label designs already sent
+    #                   to the page. The CSS rules of a design are only added to its first label.
+    def Create_SubPluginContent(self, labelDesignNo, template_name='netbox_qrcode/qrcode3.html', label_width=None, label_height=None, emitted_styles=None):
         
         thisSelf = self
 
@@ -40,46 +46,101 @@ class QRCode(PluginTemplateExtension):
         if config is None: 
             return '' 
 
-        # Get URL for QR code
-        url = create_url(thisSelf, config, obj)
+        # Shared CSS class of the label design
+        label_class = label_style = ''
+        if emitted_styles is not None:
+            label_class, label_style = get_label_style(config, label_width, label_height)
+            if label_class in emitted_styles:
+                label_style = ''
+            else:
+                emitted_styles.add(label_class)
+
+        # The rendered label is cached until the object or the configuration changes.
+        label_cache = get_label_cache()
+        if label_cache is None:
+            return label_style + self.Render_SubPluginContent(config, labelDesignNo, template_name, label_width, label_height, label_class)
+
+        timeout = get_label_cache_timeout()
+        with get_timer(thisSelf.context['request']).stage('cache'):
+            version = get_label_version(label_cache, obj, timeout)
+            key = make_label_key(obj, version, labelDesignNo, config.digest, template_name, label_width, label_height,
+                                 label_class, thisSelf.context['request'].build_absolute_uri('/'))
+            render = label_cache.get(key)
+        if render is None:
+            render = self.Render_SubPluginContent(config, labelDesignNo, template_name, label_width, label_height, label_class)
+            label_cache.set(key, render, timeout)
+        return label_style + render
+
+    ##################################          
+    # Renders the label of a design (QR code, text and template).
+    # --------------------------------
+    # Parameter:
+    #   config: Label configuration of the design.
+    #   labelDesignNo: Which label design should be loaded.
+    #   label_class: CSS class of the label design (printed labels only).
+    def Render_SubPluginContent(self, config, labelDesignNo, template_name, label_width, label_height, label_class=''):
+
+        thisSelf = self
+
+        obj = self.context['object'] # An object of the type Device, Rack etc.
 
-        # Create a QR code
-        qrCode = create_QRCode(url, config)
+        # Time spent per stage, see timing.py
+        timer = get_timer(thisSelf.context['request'])
+
+        # Get URL for QR code
+        with timer.stage('url'):
+            url = create_url(thisSelf, config, obj)
+
+        # Create a QR code, or only reference it by URL. The image is then served separately
+        # and only created for user text templates which embed it.
+        qrCode = qrSrc = ''
+        with timer.stage('qr'):
+            if config.get('qr_image_mode') == 'url':
+                qrSrc = create_QRCode_url(thisSelf, labelDesignNo, url, config)
+                if 'qrCode' in (config.get('text_template') or ''):
+                    qrCode = create_QRCode(url, config, thisSelf.context.get('qr_images'))
+            else:
+                qrCode = create_QRCode(url, config, thisSelf.context.get('qr_images'))
 
         # Create the text for the label if required.
-        text = create_text(config, obj, qrCode)
+        with timer.stage('text'):
+            text = create_text(config, obj, qrCode)
 
         # Create plugin using template
         try:
             if version.parse(settings.RELEASE.version).major >= 3:
 
-                render = self.render(
-                    template_name, extra_context={
-                                                                    'title': config.get('title'),
-                                                                    'labelDesignNo': labelDesignNo,
-                                                                    'qrCode': qrCode, 
-                                                                    'with_text': config.get('with_text'),
-                                                                    'text': text,
-                                                                    'text_location': config.get('text_location'),
-                                                                    'text_align_horizontal': config.get('text_align_horizontal'),
-                                                                    'text_align_vertical': config.get('text_align_vertical'),
-                                                                    'font': config.get('font'),
-                                                                    'font_size': config.get('font_size'),
-                                                                    'font_weight': config.get('font_weight'),
-                                                                    'font_color': config.get('font_color'),
-                                                                    'with_qr': config.get('with_qr'),
-                                                                    'label_qr_width': config.get('label_qr_width'),
-                                                                    'label_qr_height': config.get('label_qr_height'),
-                                                                    'label_qr_text_distance': config.get('label_qr_text_distance'),
-                                                                    'label_width': label_width,
-                                                                    'label_height': label_height, 
-                                                                    'label_edge_top': config.get('label_edge_top'),
-                                                                    'label_edge_left': config.get('label_edge_left'),
-                                                                    'label_edge_right': config.get('label_edge_right'),
-                                                                    'label_edge_bottom': config.get('label_edge_bottom')
-                                                                }
-
-                )
+                with timer.stage('template'):
+                    render = self.render(
+                        template_name, extra_context={
+                                                                        'title': config.get('title'),
+                                                                        'labelDesignNo': labelDesignNo,
+                                                                        'qrCode': qrCode, 
+                                                                        'qrSrc': qrSrc,
+                                                                        'with_text': config.get('with_text'),
+                                                                        'text': text,
+                                                                        'text_location': config.get('text_location'),
+                                                                        'text_align_horizontal': config.get('text_align_horizontal'),
+                                                                        'text_align_vertical': config.get('text_align_vertical'),
+                                                                        'font': config.get('font'),
+                                                                        'font_size': config.get('font_size'),
+                                                                        'font_weight': config.get('font_weight'),
+                                                                        'font_color': config.get('font_color'),
+                                                                        'with_qr': config.get('with_qr'),
+                                                                        'qr_format': config.get('qr_format'),
+                                                                        'label_qr_width': config.get('label_qr_width'),
+                                                                        'label_qr_height': config.get('label_qr_height'),
+                                                                        'label_qr_text_distance': config.get('label_qr_text_distance'),
+                                                                        'label_width': label_width,
+                                                                        'label_height': label_height, 
+                                                                        'label_edge_top': config.get('label_edge_top'),
+                                                                        'label_edge_left': config.get('label_edge_left'),
+                                                                        'label_edge_right': config.get('label_edge_right'),
+                                                                        'label_edge_bottom': config.get('label_edge_bottom'),
+                                                                        'label_class': label_class,
+                                                                    }
+
+                    )
             
                 return render
             else:
@@ -97,23 +158,13 @@ class QRCode(PluginTemplateExtension):
     #   further label views are also created as additional plugin views.
     def Create_PluginContent(self):
 
-        # First Plugin Content
-        pluginContent = QRCode.Create_SubPluginContent(self, 1) 
+        # Further label configurations (objectName_2 to ..._10) per object (e.g. device, rack, etc.)
+        # are determined once by the resolver, the first label is always created.
+        resolver = get_label_config_resolver(self.context['config']) # Django configuration
 
-        # Check whether there is another configuration for the object, e.g. device, rack, etc.
-        # Support up to 10 additional label configurations (objectName_2 to ..._10) per object (e.g. device, rack, etc.).
-
-        config = self.context['config'] # Django configuration
-
-        for i in range(2, 11):
-
-            configName = self.models[0].replace('dcim.', '') + '_' + str(i)
-            obj_cfg = config.get(configName) # Load configuration for additional label if possible.
-
-            if(obj_cfg):
-                pluginContent += QRCode.Create_SubPluginContent(self, i) # Add another plugin view
-            else:
-                break
+        pluginContent = ''
+        for labelDesignNo in resolver.designs(model_config_name(self)):
+            pluginContent += QRCode.Create_SubPluginContent(self, labelDesignNo) # Add plugin view
         
         return pluginContent
 
@@ -1,36 +1,125 @@
-from .utilities import get_img_b64, get_qr
-from django.template import engines
+import hashlib
+import logging
+
+from .cache import QRImageCache, get_qr_cache
+from .configs import LabelConfig, get_label_config_resolver
+from .encoding import encode_qr
+from django.template import TemplateSyntaxError, engines
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
 
 # ******************************************************************************************
 # For better clarity, the sub-functions of template_content.py have been outsourced.
 # ******************************************************************************************
 
+# Compiled user templates (url_template, text_template) and templates which failed to compile,
+# both keyed by the template source.
+_compiled_templates = {}
+_template_errors = {}
+
+# Configuration entries which contain a user-defined template.
+TEMPLATE_CONFIG_KEYS = ('url_template', 'text_template')
+
+# Configuration entries which determine the style of a printed label.
+LABEL_STYLE_KEYS = (
+    'with_text', 'with_qr', 'text_location', 'text_align_horizontal', 'text_align_vertical',
+    'font', 'font_size', 'font_weight', 'font_color',
+    'label_qr_width', 'label_qr_height', 'label_qr_text_distance',
+    'label_edge_top', 'label_edge_left', 'label_edge_right', 'label_edge_bottom',
+)
+
+# CSS class name and rules of the label styles, keyed by the style relevant configuration values.
+_label_styles = {}
+
+##################################
+# Returns the compiled template for a user-defined template source.
+# Each source is only parsed once per process, invalid sources are not parsed again.
+# --------------------------------
+# Parameter:
+#   source: Template source in ninja2 format.
+def get_template(source):
+
+    template = _compiled_templates.get(source)
+    if template is not None:
+        return template
+
+    error = _template_errors.get(source)
+    if error is not None:
+        raise error.with_traceback(None) # Already reported, don't parse again.
+
+    try:
+        template = engines["django"].from_string(source)
+    except TemplateSyntaxError as e:
+        _template_errors[source] = e
+        raise
+
+    _compiled_templates[source] = template
+    return template
+
+##################################
+# Compiles all user-defined templates of the plugin configuration in advance,
+# including those of the module-dependent configurations (e.g. device, rack_2 etc.).
+# Invalid templates are reported once.
+# --------------------------------
+# Parameter:
+#   config: Plugin configuration
+def precompile_templates(config):
+
+    sections = [('', config)]
+    sections += [(name, value) for name, value in config.items() if isinstance(value, dict)]
+
+    for name, section in sections:
+        for key in TEMPLATE_CONFIG_KEYS:
+            source = section.get(key)
+            if not source:
+                continue
+            try:
+                get_template(source)
+            except TemplateSyntaxError as e:
+                setting = f'{name}.{key}' if name else key
+                logger.error(f"netbox_qrcode: invalid template in setting '{setting}': {e}")
+
 ##################################
 # The configuration is taken and all fields that are module-specific (e.g. Device, Rack, etc.) are replaced.
+# The configurations are resolved once per model and label design and then only looked up.
 # --------------------------------
 # Parameter:
 #   labelDesignNo: Which label design should be loaded.
 #   parentSelf: Self from Parrent Function
 def config_for_modul(parentSelf, labelDesignNo):
 
-    # Copy so that the Runtime data is not changed.
-    config = parentSelf.context['config'].copy() # From Netbox Config File
+    resolver = get_label_config_resolver(parentSelf.context['config']) # From Netbox Config File
+    return resolver.resolve(model_config_name(parentSelf), labelDesignNo)
 
-    # Create suffix to read the correct module configuration.
-    confModulsufix = str() # None if the first standard label
+##################################
+# Name of the module configuration of the object, e.g. "device" for dcim.device.
+# --------------------------------
+# Parameter:
+#   parentSelf: Self from Parrent Function
+def model_config_name(parentSelf):
+    return parentSelf.models[0].replace('dcim.', '')
+
+##################################
+# Returns the CSS class and the CSS rules for printed labels of a design.
+# All labels which share the style relevant configuration values (see LABEL_STYLE_KEYS)
+# and dimensions share one class, so the rules only have to be sent once per page.
+# --------------------------------
+# Parameter:
+#   config: From the Netbox configuration file
+#   label_width: Label width, e.g. "64mm"
+#   label_height: Label height, e.g. "32mm"
+def get_label_style(config, label_width, label_height):
 
-    if(labelDesignNo >= 2):
-            confModulsufix = '_' + str(labelDesignNo)
+    values = tuple(config.get(key) for key in LABEL_STYLE_KEYS) + (label_width, label_height)
 
-    # Collect the QR code plugin configuration for the specific object such as device, rack etc.
-    # and overwrite the default configuration fields.
-    obj_cfg = config.get(parentSelf.models[0].replace('dcim.', '') + confModulsufix) # get spezific object settings
-    
-    if obj_cfg is not None: 
-        config.update(obj_cfg) # Ovverride default confiv Values
-        return config
-    else:
-        return config # No module customisation
+    style = _label_styles.get(values)
+    if style is None:
+        class_name = 'qr-label-' + hashlib.sha1(repr(values).encode('utf-8')).hexdigest()[:10]
+        context = dict(zip(LABEL_STYLE_KEYS, values), label_width=label_width, label_height=label_height, class_name=class_name)
+        style = _label_styles[values] = (class_name, render_to_string('netbox_qrcode/inc/label_style.html', context))
+    return style
 
 ##################################
 # Create QR-Code
@@ -38,19 +127,72 @@ def config_for_modul(parentSelf, labelDesignNo):
 # Parameter:
 #   text: Text for QR-Code
 #   config: From the Netbox configuration file
-def create_QRCode(text, config):
+#   images: QR code images encoded in advance by key (see QREncoderPool.encode), optional.
+def create_QRCode(text, config, images=None):
+
+    # The configuration entries that begin with "qr_" are required to generate the QR code.
+    # They are split off once when the configuration is resolved.
+    if not isinstance(config, LabelConfig):
+        config = LabelConfig.from_dict(config)
+
+    qr_args = config.qr_args
+    qr_format = config.qr_format
+
+    # Create a QR code (PNG as Base64 or SVG markup for inlining), or reuse the image of an
+    # identical payload and configuration.
+    return get_qr_image(text, qr_args, qr_format, images)
 
-    # Collect the configuration entries that begin with "qr_.
-    # These are required to generate the QR code.
-    qr_args = {}
-    for k, v in config.items():
-        if k.startswith('qr_'):
-            qr_args[k.replace('qr_', '')] = v
+##################################
+# Returns a QR code image in any format (see encode_qr): encoded in advance, cached, or
+# encoded now and cached.
+# --------------------------------
+# Parameter:
+#   text: Text for QR-Code
+#   qr_args: Parameters of the QR code (see LabelConfig.qr_args)
+#   qr_format: png, svg or pdf
+#   images: QR code images encoded in advance by key (see QREncoderPool.encode), optional.
+def get_qr_image(text, qr_args, qr_format, images=None):
 
-    # Create a QR code
-    qrCode = get_qr(text, **qr_args)
-    return get_img_b64(qrCode)
+    if images:
+        image = images.get(QRImageCache.make_key(text, dict(qr_args, format=qr_format)))
+        if image is not None:
+            return image
+    return get_qr_cache().get_or_create(text, dict(qr_args, format=qr_format), lambda: encode_qr(text, qr_args, qr_format))
+
+
+##################################
+# Version of a QR code image: A hash of the text and all QR code parameters.
+# It changes whenever the image changes and is used as ETag and in image URLs.
+# --------------------------------
+# Parameter:
+#   text: Text for QR-Code
+#   config: From the Netbox configuration file
+def get_qr_version(text, config):
+
+    if not isinstance(config, LabelConfig):
+        config = LabelConfig.from_dict(config)
+
+    return QRImageCache.make_key(text, dict(config.qr_args, format=config.qr_format))[:20]
+
+##################################
+# URL of the QR code image of a label, for labels which reference the image
+# instead of embedding it (qr_image_mode "url"). The version in the URL changes
+# with the image, so the image can be cached by browsers and proxies indefinitely.
+# --------------------------------
+# Parameter:
+#   parentSelf: Self from Parrent Function
+#   labelDesignNo: Label design of the QR code.
+#   text: Text for QR-Code
+#   config: From the Netbox configuration file
+def create_QRCode_url(parentSelf, labelDesignNo, text, config):
 
+    obj = parentSelf.context['object']
+    path = reverse('plugins:netbox_qrcode:qrcode_image', kwargs={
+        'model_name': obj._meta.model_name,
+        'pk': obj.pk,
+        'labelDesignNo': labelDesignNo,
+    })
+    return parentSelf.context['request'].build_absolute_uri(f'{path}?v={get_qr_version(text, config)}')
 
 ##################################
 # Create URL for QR code
@@ -65,8 +207,7 @@ def create_url(parentSelf, config, obj):
 
     if config.get('url_template'):
         # A user-defined design specification of the URL is provided in ninja2 format.
-        django_engine = engines["django"]
-        template = django_engine.from_string(config.get('url_template')) # Custom template for URL design.
+        template = get_template(config.get('url_template')) # Custom template for URL design.
         return template.render({'obj': obj}) # Replace placeholder
     else:
         return request.build_absolute_uri(obj.get_absolute_url()) # URL to the requested page
@@ -97,8 +238,7 @@ def create_text(config, obj, qrCode):
 #   qrCode: QR-Code Image (To create a freely defined label with QR code.)
 def get_text_template(config, obj, qrCode):
 
-    django_engine = engines["django"]
-    template = django_engine.from_string(config.get('text_template')) # Get Custom Template
+    template = get_template(config.get('text_template')) # Get Custom Template
     logo = config.get('logo')
     return template.render({'obj': obj, 
                             'logo': logo,
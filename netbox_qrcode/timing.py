@@ -0,0 +1,107 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    from prometheus_client import Counter
+except ImportError:
+    Counter = None
+
+# ******************************************************************************************
+# Timing of the stages of the label pipeline. The time spent per stage is added up per
+# request and reported as Server-Timing header and (optionally) as Prometheus counters.
+# ******************************************************************************************
+
+# Stages of the label pipeline -> description, in the order of the Server-Timing header.
+STAGES = {
+    'db': 'Database queries',
+    'cache': 'Label cache',
+    'url': 'create_url',
+    'qr': 'create_QRCode',
+    'text': 'create_text',
+    'template': 'Label templates',
+    'page': 'Page render',
+}
+
+_metrics = None
+
+
+def get_metrics():
+    """
+    Return the Prometheus counters (seconds, calls) of the stages, or None if the NetBox metrics
+    are disabled or prometheus_client is not installed.
+    """
+    global _metrics
+    if _metrics is None:
+        if Counter is None or not getattr(settings, 'METRICS_ENABLED', False):
+            _metrics = False
+        else:
+            _metrics = (
+                Counter('netbox_qrcode_stage_seconds', 'Time spent per stage of the QR code label pipeline', ['stage']),
+                Counter('netbox_qrcode_stage_calls', 'Number of calls per stage of the QR code label pipeline', ['stage']),
+            )
+    return _metrics or None
+
+
+class StageTimer:
+    """
+    Adds up the time spent per stage and the number of calls of each stage.
+
+    Stages can be nested, e.g. the labels are created while the page is rendered, so the
+    time of "page" includes the time of the label stages.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as part of the stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.durations[name] += duration
+            self.counts[name] += 1
+
+            metrics = get_metrics()
+            if metrics is not None:
+                seconds, calls = metrics
+                seconds.labels(name).inc(duration)
+                calls.labels(name).inc()
+
+    def as_dict(self):
+        """Return the stages as {stage: {'ms': duration, 'count': calls}}."""
+        return {
+            name: {'ms': round(self.durations[name] * 1000, 1), 'count': self.counts[name]}
+            for name in STAGES if name in self.counts
+        }
+
+    def server_timing(self):
+        """Return the value of the Server-Timing header."""
+        return ', '.join(
+            f'{name};dur={timing["ms"]};desc="{STAGES[name]} ({timing["count"]}x)"'
+            for name, timing in self.as_dict().items()
+        )
+
+    def __str__(self):
+        return ', '.join(f'{name}={timing["ms"]}ms/{timing["count"]}' for name, timing in self.as_dict().items())
+
+
+def get_timer(request):
+    """Return the stage timer of a request, it is created with the first stage of the request."""
+    timer = getattr(request, '_qrcode_timer', None)
+    if timer is None:
+        timer = request._qrcode_timer = StageTimer()
+    return timer
+
+
+def add_server_timing(response, request):
+    """Add the stages timed so far to the response, if enabled with `server_timing`."""
+    if settings.PLUGINS_CONFIG.get('netbox_qrcode', {}).get('server_timing'):
+        response['Server-Timing'] = get_timer(request).server_timing()
+    return response
@@ -12,5 +12,11 @@ urlpatterns = (
     path('print/modules/', views.ModuleQRCodePrintView.as_view(), name='qrcode_print_module'),
     path('print/assets/', views.AssetQRCodePrintView.as_view(), name='qrcode_print_asset'),
 
+    path('qr/<str:model_name>/<int:pk>/<int:labelDesignNo>/', views.QRCodeImageView.as_view(), name='qrcode_image'),
+
     path('print/preview/', views.QRCodePrintPreviewView.as_view(), name='qrcode_print_preview'),
+    path('print/jobs/', views.QRCodePrintJobView.as_view(), name='qrcode_print_job_create'),
+    path('print/jobs/<int:pk>/', views.QRCodePrintJobStatusView.as_view(), name='qrcode_print_job'),
+    path('print/jobs/<int:pk>/download/', views.QRCodePrintJobDownloadView.as_view(), name='qrcode_print_job_download'),
+    path('printers/', views.QRCodePrinterStatusView.as_view(), name='qrcode_printers'),
 )
\ No newline at end of file
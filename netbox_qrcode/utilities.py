@@ -1,9 +1,10 @@
 import base64
 import re
+import zlib
 from io import BytesIO
+from itertools import groupby
 from typing import Any, Optional, Tuple
 
-import qrcode
 from django.conf import settings
 
 # ******************************************************************************************
@@ -17,13 +18,150 @@ from django.conf import settings
 #   text: Text to be included in the QR code.
 #   **kwargs: List of parameters which properties the QR code should have. (e.g. version, box_size, error_correction, border etc.)
 def get_qr(text, **kwargs):
-    qr = qrcode.QRCode(**kwargs)
-    qr.add_data(text)
-    qr.make(fit=True)
+    qr = make_qr(text, **kwargs)
+    if numpy_installed():
+        return rasterize_qr(qr) # Fast path, identical image
     img = qr.make_image()
     img = img.get_image()
     return img
 
+##################################          
+# Renders the module matrix of a QR code as 1-bit image with NumPy, instead of drawing
+# every module as rectangle. The result is identical to qr.make_image() with the default
+# (black on white) PIL image.
+# --------------------------------
+# Parameter:
+#   qr: QR code data structure (see make_qr)
+def rasterize_qr(qr):
+    import numpy
+    from PIL import Image
+
+    modules = numpy.array(qr.modules, dtype=bool)
+    modules = numpy.pad(modules, qr.border) # Border of light modules
+    pixels = numpy.repeat(numpy.repeat(~modules, qr.box_size, axis=0), qr.box_size, axis=1) # True = white
+    height, width = pixels.shape
+    return Image.frombytes('1', (width, height), numpy.packbits(pixels, axis=1).tobytes())
+
+##################################          
+# Checks whether NumPy is available for the fast QR code rasterizer.
+_numpy_installed = None
+
+def numpy_installed():
+    global _numpy_installed
+    if _numpy_installed is None:
+        try:
+            import numpy # noqa: F401
+            _numpy_installed = True
+        except ImportError:
+            _numpy_installed = False
+    return _numpy_installed
+
+# Smallest fitting QR code versions, see make_qr.
+_fitted_versions = {}
+
+##################################          
+# Creates the QR code data structure (module matrix) without rendering an image.
+# --------------------------------
+# Parameter:
+#   text: Text to be included in the QR code.
+#   **kwargs: List of parameters which properties the QR code should have. (e.g. version, box_size, error_correction, border etc.)
+#   strict_version: Use the configured version without searching for the smallest fitting one.
+#                   Larger versions are only chosen if the text does not fit.
+def make_qr(text, strict_version=False, **kwargs):
+    # Imported on first use, processes which never create a label don't load qrcode
+    import qrcode
+    from qrcode.exceptions import DataOverflowError
+
+    qr = qrcode.QRCode(**kwargs)
+    qr.add_data(text)
+
+    if strict_version and qr.version:
+        try:
+            qr.make(fit=False)
+            return qr
+        except DataOverflowError:
+            qr.data_cache = None # Too much data for the version, fit a larger one below.
+
+    # The fitting version only depends on the data segments (mode and length), the error
+    # correction and the start version. URLs of the same length fit the same version,
+    # so the search is only done once for them.
+    key = (tuple((data.mode, len(data)) for data in qr.data_list), qr.error_correction, qr.version)
+    version = _fitted_versions.get(key)
+    if version is None:
+        qr.make(fit=True)
+        _fitted_versions[key] = qr.version
+    else:
+        qr.version = version
+        qr.make(fit=False)
+    return qr
+
+##################################
+# Returns the QR code version (size) make_qr would use for the text, without creating the
+# module matrix. E.g. for printers which encode the QR code themselves.
+# --------------------------------
+# Parameter: See make_qr. The configured version is kept with and without strict_version
+#            as long as the text fits.
+def fit_qr_version(text, strict_version=False, **kwargs):
+    import qrcode
+
+    qr = qrcode.QRCode(**kwargs)
+    qr.add_data(text)
+
+    key = (tuple((data.mode, len(data)) for data in qr.data_list), qr.error_correction, qr.version)
+    version = _fitted_versions.get(key)
+    if version is None:
+        version = _fitted_versions[key] = qr.best_fit(start=qr.version)
+    return version
+
+##################################          
+# Creates a QR code as a vector graphic (SVG) directly from the module matrix.
+# Neither Pillow nor PNG compression is involved. Each run of dark modules in a row
+# becomes one stroked line segment of a single path, which keeps the markup compact.
+# --------------------------------
+# Parameter:
+#   text: Text to be included in the QR code.
+#   **kwargs: List of parameters which properties the QR code should have. (e.g. version, error_correction, border etc.)
+def get_qr_svg(text, **kwargs):
+    matrix = make_qr(text, **kwargs).get_matrix() # Includes the border
+    size = len(matrix)
+
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0 # Current pen position within the row
+        pos = 0
+        for dark, run in groupby(row):
+            width = len(list(run))
+            if dark:
+                if x == 0:
+                    path.append(f'M{pos} {y}.5h{width}') # First segment of the row
+                else:
+                    path.append(f'm{pos - x} 0h{width}') # Relative move to the next segment
+                x = pos + width
+            pos += width
+
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+            f'width="100%" height="100%" preserveAspectRatio="none" shape-rendering="crispEdges">'
+            f'<path stroke="#000" d="{"".join(path)}"/></svg>')
+
+##################################          
+# Creates a QR code as 1-bit bitmap (e.g. for PDF): Dark modules are set bits,
+# each row is padded to a full byte and the rows are zlib compressed.
+# --------------------------------
+# Parameter:
+#   text: Text to be included in the QR code.
+#   **kwargs: List of parameters which properties the QR code should have. (e.g. version, error_correction, border etc.)
+# Returns:
+#   (size, compressed rows): Size of the square bitmap in modules and the image data.
+def get_qr_bitmap(text, **kwargs):
+    matrix = make_qr(text, **kwargs).get_matrix() # Includes the border
+    size = len(matrix)
+    row_bytes = (size + 7) // 8
+    data = b''.join(
+        int(''.join('1' if dark else '0' for dark in row).ljust(row_bytes * 8, '0'), 2).to_bytes(row_bytes, 'big')
+        for row in matrix
+    )
+    return size, zlib.compress(data)
+
 ##################################          
 # Converts an image to Base64
 # --------------------------------
@@ -109,6 +247,31 @@ def get_number_and_scale(value: Any) -> Tuple[float, Optional[str]]:
             return float(num_s), (scale.strip() or None)
     raise TypeError(f"Cannot parse {value!r} as a number with optional scale")
 
+# Length of one unit in PDF points (1/72 inch).
+POINTS_PER_UNIT = {
+    'mm': 72 / 25.4,
+    'cm': 72 / 2.54,
+    'in': 72.0,
+    'pt': 1.0,
+    'px': 0.75,
+}
+
+def to_points(value: Any, default_scale: str = 'mm') -> float:
+    """
+    Convert a length such as "12mm", "0.47in" or "10pt" to PDF points (1/72 inch).
+
+    Values without a unit are interpreted in `default_scale`.
+
+    Raises:
+        ValueError: If the unit cannot be converted to an absolute length (e.g. "%").
+        TypeError: If the value cannot be parsed as a number.
+    """
+    num, scale = get_number_and_scale(value)
+    scale = (scale or default_scale).lower()
+    if scale not in POINTS_PER_UNIT:
+        raise ValueError(f"Cannot convert {value!r} to an absolute length")
+    return num * POINTS_PER_UNIT[scale]
+
 def plugin_inventory_installed():
     """
     Check if the NetBox Inventory plugin is installed.
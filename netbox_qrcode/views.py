@@ -1,75 +1,86 @@
+import base64
+import logging
+import os
+from urllib.parse import urlencode
+
 from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.conf import settings
-from django.shortcuts import redirect, render
-from django.views.generic.base import TemplateView
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+from django.views.generic.base import TemplateView, View
 from django.urls import reverse
 
-from dcim.filtersets import (
-    CableFilterSet,
-    DeviceFilterSet,
-    LocationFilterSet,
-    ModuleFilterSet,
-    PowerFeedFilterSet,
-    PowerPanelFilterSet,
-    RackFilterSet,
-)
-from dcim.forms import (
-    CableFilterForm,
-    DeviceFilterForm,
-    LocationFilterForm,
-    ModuleFilterForm,
-    PowerFeedFilterForm,
-    PowerPanelFilterForm,
-    RackFilterForm,
-)
-from dcim.models import (
-    Cable,
-    Device,
-    Location,
-    Module,
-    PowerFeed,
-    PowerPanel,
-    Rack,
-)
-from dcim.tables import (
-    CableTable,
-    DeviceTable,
-    LocationTable,
-    ModuleTable,
-    PowerFeedTable,
-    PowerPanelTable,
-    RackTable,
-)
+from core.choices import JobStatusChoices
+from core.models import Job
 from netbox.views import generic
 from utilities.htmx import htmx_partial
 
-from .template_content import (
-    QRCode,
-    DeviceQRCode,
-    RackQRCode,
-    CableQRCode,
-    LocationQRCode,
-    PowerFeedQRCode,
-    PowerPanelQRCode,
-    ModuleQRCode,
-)
-from .grid import GridPosition
-from .configs import QRPrintConfig
+from .jobs import PrintLabelsJob
+from .printing import SHEETS_PLACEHOLDER, LabelBatch, get_print_models, split_sheets
+from .selection import load_selection, save_selection
+from .spooler import get_printer, get_printers
+from .template_content_functions import config_for_modul, create_QRCode, create_url, get_qr_version
+from .timing import add_server_timing, get_timer
 from .utilities import plugin_inventory_installed
 from .form import PrintSettingsForm
 
+logger = logging.getLogger(__name__)
+
+# Classes of the bulk print views: Model name -> (model, filterset, filter form, table).
+# They are only imported when a print view is requested, not with the URL configuration.
+PRINT_VIEW_CLASSES = {
+    'device': ('dcim.models.Device', 'dcim.filtersets.DeviceFilterSet', 'dcim.forms.DeviceFilterForm', 'dcim.tables.DeviceTable'),
+    'rack': ('dcim.models.Rack', 'dcim.filtersets.RackFilterSet', 'dcim.forms.RackFilterForm', 'dcim.tables.RackTable'),
+    'cable': ('dcim.models.Cable', 'dcim.filtersets.CableFilterSet', 'dcim.forms.CableFilterForm', 'dcim.tables.CableTable'),
+    'location': ('dcim.models.Location', 'dcim.filtersets.LocationFilterSet', 'dcim.forms.LocationFilterForm', 'dcim.tables.LocationTable'),
+    'powerfeed': ('dcim.models.PowerFeed', 'dcim.filtersets.PowerFeedFilterSet', 'dcim.forms.PowerFeedFilterForm', 'dcim.tables.PowerFeedTable'),
+    'powerpanel': ('dcim.models.PowerPanel', 'dcim.filtersets.PowerPanelFilterSet', 'dcim.forms.PowerPanelFilterForm', 'dcim.tables.PowerPanelTable'),
+    'module': ('dcim.models.Module', 'dcim.filtersets.ModuleFilterSet', 'dcim.forms.ModuleFilterForm', 'dcim.tables.ModuleTable'),
+    'asset': ('netbox_inventory.models.Asset', 'netbox_inventory.filtersets.AssetFilterSet',
+              'netbox_inventory.forms.AssetFilterForm', 'netbox_inventory.tables.AssetTable'),
+}
+
+
+def get_print_view_classes(model_name):
+    """
+    Return the (model, filterset, filter form, table) of a bulk print view.
+
+    Raises:
+        Http404: If the model cannot be printed (e.g. netbox_inventory is not installed).
+    """
+    if model_name not in PRINT_VIEW_CLASSES or (model_name == 'asset' and not plugin_inventory_installed()):
+        raise Http404(f"QR code printing is not available for {model_name}")
+    return tuple(import_string(path) for path in PRINT_VIEW_CLASSES[model_name])
+
+
 class QRCodePrintBaseView(generic.ObjectListView):
+    model_name = None
     bulk_url_name = None
+    list_url_name = None # Defaults to the list view of the model
+    print_settings_form = PrintSettingsForm
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        model, self.filterset, self.filterset_form, self.table = get_print_view_classes(self.model_name)
+        self.queryset = model.objects.all()
+
+    def get_list_url(self):
+        model = self.queryset.model
+        return reverse(self.list_url_name or f'{model._meta.app_label}:{model._meta.model_name}_list')
 
     def get_template_name(self):
         return "netbox_qrcode/print.html"
 
     def get_extra_context(self, request, instance=None):
         context = super().get_extra_context(request, instance)
-        context['return_url'] = reverse(
-            f'{self.queryset.model._meta.app_label}:{self.queryset.model._meta.model_name}_list'
-        )
-        print(context['return_url'])
+        context['return_url'] = self.get_list_url()
+        logger.debug("QR code print view return URL: %s", context['return_url'])
         return context
 
     def get(self, request):
@@ -80,7 +91,8 @@ class QRCodePrintBaseView(generic.ObjectListView):
         table.columns.hide('actions')
         table.configure(request)
 
-        print(settings.PLUGINS)
+        logger.debug("QR code print view for %s", queryset.model._meta.model_name,
+                     extra={'model': queryset.model._meta.model_name, 'htmx': htmx_partial(request)})
 
         if htmx_partial(request):
             if request.GET.get('embedded', False):
@@ -99,7 +111,7 @@ class QRCodePrintBaseView(generic.ObjectListView):
                 'filter_form': self.filterset_form(request.GET),
                 'template_url': self.get_template_name(),
                 'bulk_action_url': reverse(self.bulk_url_name),
-                'return_url': reverse(f'{self.queryset.model._meta.app_label}:{self.queryset.model._meta.model_name}_list'),
+                'return_url': self.get_list_url(),
             },
         )
 
@@ -110,112 +122,54 @@ class QRCodePrintBaseView(generic.ObjectListView):
             return redirect(request.path)
         model_name = self.queryset.model._meta.model_name
         preview_url = reverse('plugins:netbox_qrcode:qrcode_print_preview')
-        from urllib.parse import urlencode
-        query = urlencode({'model': model_name, 'pk': selected_pks}, doseq=True)
+        # Keep the selection on the server, the preview is only addressed by its token.
+        token = save_selection(request.user, model_name, selected_pks)
+        params = {'selection': token}
+        if request.POST.get('start_position'):
+            params['start_position'] = request.POST['start_position']
+        query = urlencode(params)
         return redirect(f"{preview_url}?{query}")
 
 
 class DeviceQRCodePrintView(QRCodePrintBaseView):
-    queryset = Device.objects.all()
-    filterset = DeviceFilterSet
-    filterset_form = DeviceFilterForm
-    table = DeviceTable
+    model_name = 'device'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_device'
-    print_settings_form = PrintSettingsForm
 
 
 class RackQRCodePrintView(QRCodePrintBaseView):
-    queryset = Rack.objects.all()
-    filterset = RackFilterSet
-    filterset_form = RackFilterForm
-    table = RackTable
+    model_name = 'rack'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_rack'
-    print_settings_form = PrintSettingsForm
 
 
 class CableQRCodePrintView(QRCodePrintBaseView):
-    queryset = Cable.objects.all()
-    filterset = CableFilterSet
-    filterset_form = CableFilterForm
-    table = CableTable
+    model_name = 'cable'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_cable'
-    print_settings_form = PrintSettingsForm
 
 
 class LocationQRCodePrintView(QRCodePrintBaseView):
-    queryset = Location.objects.all()
-    filterset = LocationFilterSet
-    filterset_form = LocationFilterForm
-    table = LocationTable
+    model_name = 'location'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_location'
-    print_settings_form = PrintSettingsForm
 
 
 class PowerFeedQRCodePrintView(QRCodePrintBaseView):
-    queryset = PowerFeed.objects.all()
-    filterset = PowerFeedFilterSet
-    filterset_form = PowerFeedFilterForm
-    table = PowerFeedTable
+    model_name = 'powerfeed'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_powerfeed'
-    print_settings_form = PrintSettingsForm
 
 
 class PowerPanelQRCodePrintView(QRCodePrintBaseView):
-    queryset = PowerPanel.objects.all()
-    filterset = PowerPanelFilterSet
-    filterset_form = PowerPanelFilterForm
-    table = PowerPanelTable
+    model_name = 'powerpanel'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_powerpanel'
-    print_settings_form = PrintSettingsForm
 
 
 class ModuleQRCodePrintView(QRCodePrintBaseView):
-    queryset = Module.objects.all()
-    filterset = ModuleFilterSet
-    filterset_form = ModuleFilterForm
-    table = ModuleTable
+    model_name = 'module'
     bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_module'
-    print_settings_form = PrintSettingsForm
 
 
 class AssetQRCodePrintView(QRCodePrintBaseView):
-    if plugin_inventory_installed():
-        from netbox_inventory.filtersets import AssetFilterSet
-        from netbox_inventory.forms import AssetFilterForm
-        from netbox_inventory.models import Asset
-        from netbox_inventory.tables import AssetTable
-
-        queryset = Asset.objects.all()
-        filterset = AssetFilterSet
-        filterset_form = AssetFilterForm
-        table = AssetTable
-        bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_asset'
-        print_settings_form = PrintSettingsForm
-
-        def get_extra_context(self, request, instance=None):
-            context = super().get_extra_context(request, instance)
-            context['return_url'] = reverse('plugins:netbox_inventory:asset_list')
-            return context
-
-        def get(self, request):
-            queryset = self.filterset(request.GET, self.queryset, request=request).qs
-            table = self.get_table(queryset, request)
-            table.columns.show('pk')
-            table.columns.hide('actions')
-            table.configure(request)
-
-            return render(
-                request,
-                self.get_template_name(),
-                context={
-                    'model': queryset.model,
-                    'table': table,
-                    'filter_form': self.filterset_form(request.GET),
-                    'template_url': self.get_template_name(),
-                    'bulk_action_url': reverse(self.bulk_url_name),
-                    'return_url': reverse('plugins:netbox_inventory:asset_list'),
-                },
-            )
+    model_name = 'asset'
+    bulk_url_name = 'plugins:netbox_qrcode:qrcode_print_asset'
+    list_url_name = 'plugins:netbox_inventory:asset_list'
 
 
 def extract_3mm(value, default):
@@ -226,142 +180,288 @@ def extract_3mm(value, default):
     except (TypeError, ValueError):
         return default
 
+
+def get_selection(request, params):
+    """
+    Return the objects to print as (selection token, model name, pk list). The objects are
+    either given by a stored selection or (legacy) by the model and pk parameters.
+    """
+    selection = params.get('selection')
+    if selection:
+        # Objects selected in the print view and stored on the server.
+        model_name, pk_list = load_selection(request.user, selection) or (None, None)
+        return selection, model_name, pk_list
+    return None, params.get('model'), params.getlist('pk')
+
+
 class QRCodePrintPreviewView(TemplateView):
+
+    def render_streaming(self, request, template_name, context):
+        """
+        Return the preview as streaming response: the page is sent up to the sheets first,
+        then each sheet as soon as its labels are created, and finally the rest of the page.
+        """
+        timer = get_timer(request)
+        sheets = context.pop('sheets')
+        context['sheets_placeholder'] = mark_safe(SHEETS_PLACEHOLDER)
+        with timer.stage('page'):
+            parts = split_sheets(render_to_string(template_name, context, request))
+        if parts is None:
+            logger.warning("The template %s doesn't mark the place of the sheets, the preview is not streamed", template_name)
+            del context['sheets_placeholder']
+            context['sheets'] = sheets
+            with timer.stage('page'):
+                response = render(request, template_name, context)
+            return add_server_timing(response, request)
+        head, tail = parts
+        sheet_template = get_template('netbox_qrcode/inc/preview_sheet.html')
+
+        def content():
+            yield head
+            for sheet in sheets:
+                with timer.stage('page'):
+                    html = sheet_template.render({'sheet': sheet}, request)
+                yield html
+            yield tail
+            logger.debug("QR code preview streamed: %s", timer, extra={'timings': timer.as_dict()})
+
+        # The headers are sent before the labels are created, so they only time the page head.
+        return add_server_timing(StreamingHttpResponse(content()), request)
+
+    def render_pdf(self, batch):
+        """Return the labels as PDF document, streamed to the client page by page."""
+        response = StreamingHttpResponse(batch.render_pdf(), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="qrcodes_{batch.model_name}.pdf"'
+        return response
+
+    def render_zpl(self, batch):
+        """Return the labels as ZPL for label printers, streamed to the client label by label."""
+        response = StreamingHttpResponse(batch.render_zpl(), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="qrcodes_{batch.model_name}.zpl"'
+        return response
+
     def get(self, request):
         # Get form config
-        model_name = request.GET.get('model')
-        pk_list = request.GET.getlist('pk')
-        blank_spaces = int(request.GET.get('blank_spaces', 0))
+        selection, model_name, pk_list = get_selection(request, request.GET)
+        if selection and not model_name:
+            messages.error(request, "The selection for the QR code preview has expired. Please select the objects again.")
+            return redirect('/')
         if not model_name or not pk_list:
             messages.error(request, "No objects selected for QR code preview.")
             return redirect('/')
 
         # Get plugin/form config
         plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
-        print_config = QRPrintConfig(plugin_config, request.GET)
-
-        model_map = {
-            'device': Device,
-            'rack': Rack,
-            'cable': Cable,
-            'location': Location,
-            'powerfeed': PowerFeed,
-            'powerpanel': PowerPanel,
-            'module': Module,
-        }
-        extension_map = {
-            'device': DeviceQRCode,
-            'rack': RackQRCode,
-            'cable': CableQRCode,
-            'location': LocationQRCode,
-            'powerfeed': PowerFeedQRCode,
-            'powerpanel': PowerPanelQRCode,
-            'module': ModuleQRCode,
-        }
+        if model_name not in get_print_models():
+            messages.error(request, "Invalid model for QR code preview.")
+            return redirect('/')
 
-        if plugin_inventory_installed():
-            from netbox_inventory.models import Asset
-            from .template_content import Plugin_NetboxInventory_AssetQRCode
+        # Objects and labels are produced lazily while the page is rendered.
+        try:
+            batch = LabelBatch(model_name, pk_list, request.GET, request, plugin_config)
+        except ValueError as e:
+            if request.headers.get('HX-Request'):
+                return HttpResponseBadRequest(str(e))
+            # Show the preview again with the default print settings
+            messages.error(request, str(e))
+            params = {'selection': selection} if selection else {'model': model_name, 'pk': pk_list}
+            return redirect(f"{reverse('plugins:netbox_qrcode:qrcode_print_preview')}?{urlencode(params, doseq=True)}")
+        message = batch.layout_error()
+        message_type = 'error' if message else None
+
+        output = request.GET.get('output', 'html')
+        if output == 'pdf':
+            if message:
+                messages.error(request, message)
+                return redirect(request.get_full_path().replace('output=pdf', 'output=html'))
+            return self.render_pdf(batch)
+        if output == 'zpl':
+            # One label after the other, the page layout doesn't apply
+            return self.render_zpl(batch)
+
+        context = batch.get_context()
+        context.update({
+            'selection': selection,
+            'pk_list': pk_list,
+            'print_jobs': plugin_config.get('print_jobs', False),
+            'printers': list(get_printers()),
+            'message': message,
+            'message_type': message_type
+        })
 
-            model_map['asset'] = Asset
-            extension_map['asset'] = Plugin_NetboxInventory_AssetQRCode
+        if request.headers.get('HX-Request'):
+            template_name = 'netbox_qrcode/inc/preview_grid.html'
+        else:
+            template_name = 'netbox_qrcode/print_preview.html'
+
+        if plugin_config.get('preview_streaming'):
+            return self.render_streaming(request, template_name, context)
+
+        if plugin_config.get('preview_lazy_pages'):
+            # Only one sheet is created per request, the browser loads the next sheet when
+            # the end of the previous one is scrolled into view.
+            try:
+                page = int(request.GET.get('page', 1))
+            except ValueError:
+                raise Http404("Invalid page")
+            if not 1 <= page <= batch.page_count:
+                raise Http404("Invalid page")
+            if 'page' in request.GET:
+                template_name = 'netbox_qrcode/inc/preview_page.html'
+
+            context['sheets'] = batch.iter_sheets(page=page)
+            context['page_count'] = batch.page_count
+            if page < batch.page_count:
+                params = request.GET.copy()
+                params['page'] = page + 1
+                context['next_page'] = page + 1
+                context['next_page_query'] = params.urlencode()
+
+        timer = get_timer(request)
+        with timer.stage('page'):
+            response = render(request, template_name, context)
+        logger.debug("QR code preview of %d %s labels: %s", len(pk_list), model_name, timer,
+                     extra={'timings': timer.as_dict()})
+        return add_server_timing(response, request)
+
+
+class QRCodePrintJobView(LoginRequiredMixin, View):
+    """
+    Enqueues a background job which creates the labels of the selected objects, or sends them
+    to a printer (`printer`).
+    """
 
-        model = model_map.get(model_name)
-        extension_class = extension_map.get(model_name)
-        if not model or not extension_class:
-            messages.error(request, "Invalid model for QR code preview.")
+    def post(self, request):
+        plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+        printer = request.POST.get('printer') or None
+        if printer is not None and printer not in get_printers():
+            messages.error(request, f"Unknown printer: {printer}")
+            return redirect('/')
+        if not printer and not plugin_config.get('print_jobs'):
+            messages.error(request, "Background print jobs are not enabled.")
+            return redirect('/')
+
+        selection, model_name, pk_list = get_selection(request, request.POST)
+        if not model_name or not pk_list or model_name not in get_print_models():
+            messages.error(request, "No objects selected for QR code printing.")
+            return redirect('/')
+
+        # Print settings of the preview, without the selection itself.
+        params = {
+            key: value for key, value in request.POST.items()
+            if key not in ('csrfmiddlewaretoken', 'selection', 'model', 'pk', 'output', 'printer')
+        }
+        output = 'zpl' if printer else request.POST.get('output', 'pdf')
+        if output not in PrintLabelsJob.OUTPUTS:
+            messages.error(request, f"Invalid output format for QR code print job: {output}")
             return redirect('/')
-        objects = list(model.objects.filter(pk__in=pk_list))
-        objects_ordered = [next(obj for obj in objects if str(obj.pk) == pk) for pk in pk_list if any(str(obj.pk) == pk for obj in objects)]
-        # Generate QR code HTML for each object (only QR code and label, no extra card or controls)
-        qr_html_list = []
-        for obj in objects_ordered:
-            qr_label_html = QRCode.Create_SubPluginContent(
-                extension_class(context={'object': obj, 'config': plugin_config, 'request': request}),
-                labelDesignNo=obj.id, 
-                template_name='netbox_qrcode/qrcode3_print.html',
-                label_width=print_config.label_width.value,
-                label_height=print_config.label_height.value,
-            )
-            qr_html_list.append(qr_label_html)
-        # Use GridMaker for grid positions
-        num_objects = len(objects_ordered)
-
-
-        # Check for mixed scales
-        if len(print_config.scales) > 1:
-            raise ValueError(f"Mixed scale exception: {print_config.scales}")
-
-        grid = GridPosition(
-            rows=print_config.page_rows.number,
-            columns=print_config.page_columns.number,
-            elements=num_objects,
-            element_height=print_config.label_height.number,
-            element_width=print_config.label_width.number,
-            grid_width=print_config.page_width.number - (print_config.page_left_margin.number + print_config.page_right_margin.number),
-            grid_height=print_config.page_height.number - (print_config.page_top_margin.number + print_config.page_bottom_margin.number)
+
+        try:
+            batch = LabelBatch(model_name, pk_list, params, request, plugin_config)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('/')
+        # ZPL labels are printed one after another, the page layout doesn't apply
+        message = batch.layout_error() if output != 'zpl' else None
+        if message:
+            messages.error(request, message)
+            return redirect('/')
+
+        job = PrintLabelsJob.enqueue(
+            user=request.user,
+            model_name=model_name,
+            pk_list=list(pk_list),
+            params=params,
+            output=output,
+            base_url=request.build_absolute_uri('/'),
+            printer=printer,
         )
+        return redirect('plugins:netbox_qrcode:qrcode_print_job', pk=job.pk)
 
-        # TODO: We shouldn't ever get here as this should be checked when the config is loaded
-        message = None
-        message_type = None
-        if (grid.column_element_offset + grid.element_width) * grid.columns > print_config.page_width.number \
-            or (grid.row_element_offset + grid.element_height) * grid.rows > print_config.page_height.number \
-            or grid.column_element_offset < 0 \
-            or grid.row_element_offset < 0:
-
-            message = "Labels don't fit on the page with the current configuration."
-            # print(f"grid width created = {(grid.column_element_offset + grid.element_width) * grid.columns}")
-            # print(f"page width = {print_config.page_width.number}")
-            # print(f"grid width offset = {grid.column_element_offset}")
-            # print(f"grid height created = {(grid.row_element_offset + grid.element_height) * grid.rows}")
-            # print(f"page height = {print_config.page_height.number}")
-            # print(f"grid height offset = {grid.row_element_offset}")
-
-            if (grid.element_width * grid.columns)+(print_config.page_left_margin.number + print_config.page_right_margin.number) > print_config.page_width.number:
-                message += f"Too wide ({(grid.element_width * grid.columns)+(print_config.page_left_margin.number + print_config.page_right_margin.number)}{next(iter(print_config.scales))}) for page width ({print_config.page_width.value})."
-            if (grid.element_height * grid.rows)+(print_config.page_top_margin.number + print_config.page_bottom_margin.number) > print_config.page_height.number:
-                message += f"Too tall ({(grid.element_height * grid.rows)+(print_config.page_top_margin.number + print_config.page_bottom_margin.number)}{next(iter(print_config.scales))}) for page height ({print_config.page_height.value})."
-
-            message_type = 'error'
-            
-        # add blank spaces so start label isn't 1, don't know what html will want to make this work
-        # Create blank placeholders
-        blank_objs = [None] * blank_spaces
-        blank_qr = [''] * blank_spaces
-
-        # Prepend blanks
-        objects_ordered = blank_objs + objects_ordered
-        qr_html_list = blank_qr + qr_html_list
-
-        positions = [grid.getIndexByRow(i+1) for i in range(num_objects + blank_spaces)]
-        # TODO: Multi page printing???
-        per_page = grid.rows * grid.columns
-        # Pass zipped objects, qr_html, and positions to template
+
+class QRCodePrintJobStatusView(LoginRequiredMixin, View):
+    """Shows the progress of a print job. The page polls itself until the job has finished."""
+
+    def get(self, request, pk):
+        job = get_print_job(request, pk)
         context = {
-            'objects': zip(objects_ordered, qr_html_list, positions),            
-            'grid': grid,
-            'per_page': per_page,
-            'page_rows': print_config.page_rows.value,
-            'page_columns': print_config.page_columns.value,
-            'page_width': print_config.page_width.value,
-            'page_height': print_config.page_height.value,
-            'page_top_margin': print_config.page_top_margin.value,
-            'page_bottom_margin': print_config.page_bottom_margin.value,
-            'page_left_margin': print_config.page_left_margin.value,
-            'page_right_margin': print_config.page_right_margin.value,
-            'label_height': print_config.label_height.value,
-            'label_width': print_config.label_width.value,
-            'row_range': range(1, grid.rows + 1),
-            'col_range': range(1, grid.columns + 1),
-            'scale': next(iter(print_config.scales)),
-            'model': model,  # TODO: what is model?
-            'blank_spaces': blank_spaces,
-            'message': message,
-            'message_type': message_type
+            'job': job,
+            'finished': job.status in JobStatusChoices.TERMINAL_STATE_CHOICES,
+            'progress': PrintLabelsJob.get_progress(job),
         }
+        if request.headers.get('HX-Request'):
+            return render(request, 'netbox_qrcode/inc/print_job_status.html', context)
+        return render(request, 'netbox_qrcode/print_job.html', context)
+
+
+class QRCodePrintJobDownloadView(LoginRequiredMixin, View):
+    """Returns the artifact created by a finished print job."""
+
+    def get(self, request, pk):
+        job = get_print_job(request, pk)
+        artifact = (job.data or {}).get('artifact')
+        if not artifact or not default_storage.exists(artifact):
+            raise Http404("The print job has no file to download.")
+        return FileResponse(
+            default_storage.open(artifact, 'rb'), as_attachment=True, filename=os.path.basename(artifact)
+        )
+
 
+class QRCodePrinterStatusView(LoginRequiredMixin, View):
+    """
+    Shows the configured printers with their counters and the status reported by the printer.
+    The page polls itself.
+    """
+
+    def get(self, request):
+        printers = [get_printer(name).get_status() for name in get_printers()]
         if request.headers.get('HX-Request'):
-            return render(request, 'netbox_qrcode/inc/preview_grid.html', context)
-        
-        return render(request, 'netbox_qrcode/print_preview.html', context)
\ No newline at end of file
+            return render(request, 'netbox_qrcode/inc/printer_status.html', {'printers': printers})
+        return render(request, 'netbox_qrcode/printers.html', {'printers': printers})
+
+
+def get_print_job(request, pk):
+    """Return a print job, which is only visible to the user who created it (and superusers)."""
+    if request.user.is_superuser:
+        return get_object_or_404(Job, pk=pk, name=PrintLabelsJob.name)
+    return get_object_or_404(Job, pk=pk, name=PrintLabelsJob.name, user=request.user)
+
+
+class QRCodeImageView(View):
+    """
+    Serves the QR code image of a label design of an object (see `qr_image_mode`).
+
+    The ETag is derived from the QR code content and parameters. Requests for the current
+    version of the image (`?v=...`, as referenced by the labels) may be cached by browsers
+    and proxies indefinitely, any other request has to be revalidated.
+    """
+    max_age = 365 * 24 * 60 * 60
+
+    def get(self, request, model_name, pk, labelDesignNo):
+        print_models = get_print_models()
+        if model_name not in print_models:
+            raise Http404("Invalid model for QR code image.")
+        model, extension_class = print_models[model_name]
+        obj = get_object_or_404(model.objects.restrict(request.user, 'view'), pk=pk)
+
+        plugin_config = settings.PLUGINS_CONFIG.get('netbox_qrcode', {})
+        extension = extension_class(context={'object': obj, 'config': plugin_config, 'request': request})
+        config = config_for_modul(extension, labelDesignNo)
+        url = create_url(extension, config, obj)
+
+        version = get_qr_version(url, config)
+        etag = f'"{version}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            image = create_QRCode(url, config)
+            if config.qr_format == 'svg':
+                response = HttpResponse(image, content_type='image/svg+xml')
+            else:
+                response = HttpResponse(base64.b64decode(image), content_type='image/png')
+        response['ETag'] = etag
+
+        if request.GET.get('v') == version:
+            patch_cache_control(response, public=True, max_age=self.max_age, immutable=True)
+        else:
+            patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,131 @@
+from .pdf import _wrap, label_boxes, text_lines
+from .utilities import POINTS_PER_UNIT, fit_qr_version, to_points
+
+# ******************************************************************************************
+# ZPL output for Zebra (and compatible) label printers. The printer encodes the QR codes
+# (^BQ) and renders the text with its own font, so only a few commands are sent per label
+# instead of a rasterised page.
+# ******************************************************************************************
+
+# Error correction of the qrcode package (ERROR_CORRECT_M, _L, _H, _Q) -> level of ^BQ.
+ERROR_CORRECTION = {0: 'M', 1: 'L', 2: 'H', 3: 'Q'}
+
+# Largest magnification (module size in dots) of a ^BQ QR code.
+MAX_MAGNIFICATION = 10
+
+
+class ZPLRenderer:
+    """
+    Renders labels as ZPL, one label format (^XA ... ^XZ) per label. The labels are printed one
+    after another in the label size of the print configuration, the page settings (rows,
+    columns, margins) don't apply.
+
+    Args:
+        print_config (QRPrintConfig): Label dimensions.
+        dpi (int): Resolution of the printer in dots per inch, e.g. 203, 300 or 600.
+    """
+
+    def __init__(self, print_config, dpi=203):
+        scale = next(iter(print_config.scales), None) or 'mm'
+        if scale not in POINTS_PER_UNIT:
+            raise ValueError(f"Cannot create ZPL for the scale {scale!r}")
+        unit = POINTS_PER_UNIT[scale]
+
+        self.dots_per_point = dpi / 72
+        self.label_width = print_config.label_width.number * unit
+        self.label_height = print_config.label_height.number * unit
+
+    def dots(self, points):
+        """Convert a length in points to printer dots."""
+        return round(points * self.dots_per_point)
+
+    def setup(self):
+        """
+        Return the printer settings (UTF-8, label size and home position). They are kept by the
+        printer for all following labels, so they are only sent once.
+        """
+        return f'^XA^CI28^PW{self.dots(self.label_width)}^LL{self.dots(self.label_height)}^LH0,0^XZ\n'.encode('ascii')
+
+    def render(self, labels):
+        """
+        Yield the printer settings and then the ZPL of each label.
+
+        Args:
+            labels (iterable[tuple[int, PDFLabel]]): Labels in print order, each with its index.
+        """
+        yield self.setup()
+        for index, label in labels:
+            yield self.render_label(label)
+
+    def render_label(self, label):
+        """Return the ZPL of a label (UTF-8), see `setup` for the printer settings."""
+        config = label.config
+        qr_box, text_box = label_boxes(config, self.label_width, self.label_height)
+
+        commands = ['^XA']
+        if qr_box:
+            commands.append(self.render_qr(label.payload, config.qr_args, qr_box))
+        if text_box:
+            commands += self.render_text(label.text, config, text_box)
+        commands.append('^XZ\n')
+        return ''.join(commands).encode('utf-8')
+
+    def render_qr(self, payload, qr_args, box):
+        """
+        Return the ^BQ field of the QR code, centered in its box. The magnification is the largest
+        one at which the QR code including its border (quiet zone) fits into the box.
+        """
+        border = int(qr_args.get('border', 4))
+        modules = 17 + 4 * fit_qr_version(payload, **qr_args) + 2 * border
+        bx, by, bw, bh = (self.dots(value) for value in box)
+        magnification = max(1, min(MAX_MAGNIFICATION, min(bw, bh) // modules))
+
+        size = modules * magnification
+        x = bx + (bw - size) // 2 + border * magnification
+        y = by + (bh - size) // 2 + border * magnification
+        level = ERROR_CORRECTION.get(qr_args.get('error_correction', 0), 'M')
+        return f'^FO{x},{y}^BQN,2,{magnification}{_field(level + "A," + payload)}'
+
+    def render_text(self, html, config, box):
+        """
+        Return the fields of the text lines, wrapped and aligned as in the PDF. Lines which
+        don't fit into the box are left out.
+        """
+        bx, by, bw, bh = box
+        size = to_points(config.get('font_size') or '3mm')
+        leading = size * 1.2
+
+        lines = []
+        for paragraph in text_lines(html):
+            lines += _wrap(paragraph, 'F1', size, bw)
+        lines = lines[:max(int((bh - size) // leading) + 1, 1)]
+        if not lines:
+            return []
+
+        align_vertical = config.get('text_align_vertical')
+        total = leading * (len(lines) - 1) + size
+        if align_vertical == 'top':
+            top = by
+        elif align_vertical == 'bottom':
+            top = by + bh - total
+        else:
+            top = by + (bh - total) / 2
+
+        # Left aligned lines start at the field origin, the others are aligned in a block as wide as the box
+        justification = {'center': 'C', 'right': 'R'}.get(config.get('text_align_horizontal'))
+        block = f'^FB{self.dots(bw)},1,0,{justification},0' if justification else ''
+        return [f'^CF0,{self.dots(size)}'] + [
+            f'^FO{self.dots(bx)},{self.dots(top + number * leading)}{block}{_field(line)}'
+            for number, line in enumerate(lines)
+        ]
+
+
+def _field(data):
+    """
+    Return the field data command of a text. The hexadecimal indicator, the command prefixes and
+    control characters are escaped for ^FH, which is only added if necessary.
+    """
+    if not any(char in '_^~' or ord(char) < 32 for char in data):
+        return f'^FD{data}^FS'
+    escaped = ''.join(f'_{ord(char):02X}' if char in '_^~' or ord(char) < 32 else char for char in data)
+    return f'^FH^FD{escaped}^FS'
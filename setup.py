@@ -40,6 +40,10 @@ setup(
         'qrcode',
         'Pillow'
     ],
+    extras_require={
+        # Faster rendering of PNG QR codes
+        'numpy': ['numpy'],
+    },
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
         'License :: OSI Approved :: Apache Software License',